@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from functions import read_exiobase, upstream_impact
+
+# Compare upstream_impact (one LU factorisation and a Schur complement)
+# with the previous calculation with two pseudo-inverses.
+year = 2013
+data_path = Path("../../data")
+target_sectors = [
+    'Paddy rice',
+    'Wheat',
+    'Cereal grains nec',
+    'Vegetables, fruit, nuts',
+    'Oil seeds',
+    'Sugar cane, sugar beet',
+    'Plant-based fibers',
+    'Crops nec',
+    'Cattle',
+    'Pigs',
+    'Poultry',
+    'Meat animals nec',
+    'Animal products nec',
+    'Raw milk',
+    'Fish and other fishing products; services incidental of fishing (05)'
+]
+cut_sectors = [
+    'N-fertiliser',
+    'P- and other fertiliser'
+]
+# Largest difference allowed, relative to the largest value
+tolerance = 1e-6
+
+
+# %%
+def upstream_demand_pinv(A, Y, target_sectors, cut_sectors):
+    """Indirect demand and upstream production as calculated before, with
+    np.linalg.pinv of I - A and of I - A_other_other."""
+    other_sectors = (
+        A.index.get_level_values("sector")
+        .drop(cut_sectors)
+        .drop(target_sectors)
+        .values
+    )
+    A_modified = (
+        A
+        .drop(cut_sectors, axis=0, level=1)
+        .drop(cut_sectors, axis=1, level=1)
+    )
+    Y_modified = (
+        Y
+        .drop(cut_sectors, axis=0, level=1)
+        .drop("Exports: Total (fob)", axis=1, level=1)
+    )
+    L_all_target = pd.DataFrame(
+        np.linalg.pinv(np.eye(len(A_modified)) - A_modified.values),
+        index=A_modified.index,
+        columns=A_modified.columns,
+    ).drop(other_sectors, axis=1, level="sector")
+    A_target_other = (
+        A_modified
+        .drop(other_sectors, axis=0, level="sector")
+        .drop(target_sectors, axis=1, level="sector")
+    )
+    A_other_other = (
+        A_modified
+        .drop(target_sectors, axis=0, level="sector")
+        .drop(target_sectors, axis=1, level="sector")
+    )
+    L_other_other = pd.DataFrame(
+        np.linalg.pinv(np.eye(len(A_other_other)) - A_other_other.values),
+        index=A_other_other.index,
+        columns=A_other_other.columns,
+    )
+    indirect_demand = A_target_other.dot(
+        L_other_other.dot(
+            Y_modified.drop(target_sectors, axis=0, level="sector")
+        )
+    )
+    total_demand = (
+        Y_modified.drop(other_sectors, axis=0, level="sector")
+        + indirect_demand
+    )
+    return {
+        "Indirect demand": indirect_demand,
+        "Upstream production": L_all_target.dot(total_demand),
+    }
+
+
+# %%
+A, Y, S = read_exiobase(year, data_path)
+
+timings = {}
+start = time.perf_counter()
+reference = upstream_demand_pinv(A, Y, target_sectors, cut_sectors)
+timings["pinv"] = time.perf_counter() - start
+
+start = time.perf_counter()
+results = upstream_impact(
+    A,
+    Y,
+    S,
+    target_sectors=target_sectors,
+    cut_sectors=cut_sectors
+)
+timings["LU and Schur complement"] = time.perf_counter() - start
+
+# Both calculations must give the same demands
+for name in reference:
+    difference = (results[name] - reference[name]).abs().max().max()
+    scale = reference[name].abs().max().max()
+    print(f"{name}: largest relative difference {difference / scale:.1e}")
+    assert difference <= tolerance * scale, f"{name} differs"
+
+print(pd.Series(timings, name="seconds").round(2))
+print("Speed-up:", round(timings["pinv"] / timings["LU and Schur complement"], 1))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from functions import read_exiobase
+
+# Check that read_exiobase returns the same A, Y and S from the binary
+# cache as from the text files, that cached reads are memory-mapped, and
+# that the cache is rebuilt when a source file changes. The EXIOBASE files
+# of a small random year are written to a temporary folder.
+year = 2013
+regions = ["AT", "BE"]
+sectors = ["Wheat", "Cattle", "Steel"]
+index = pd.MultiIndex.from_product(
+    [regions, sectors], names=["region", "sector"]
+)
+
+
+def write_year(data_path, seed):
+    rng = np.random.default_rng(seed)
+    MRIOT_path = data_path / "EXIOBASE" / "IOT_txt" / "pxp" / f"IOT_{year}_pxp"
+    energy_extension_path = (
+        data_path
+        / "EXIOBASE"
+        / "Extensions"
+        / "energy"
+        / "pxp"
+        / f"IOT_{year}_pxp"
+    )
+    MRIOT_path.mkdir(parents=True, exist_ok=True)
+    energy_extension_path.mkdir(parents=True, exist_ok=True)
+
+    pd.DataFrame(
+        rng.random((len(index), len(index))) / 10, index=index, columns=index
+    ).to_csv(MRIOT_path / "A.txt", sep="\t")
+    pd.DataFrame(
+        rng.random((len(index), 4)),
+        index=index,
+        columns=pd.MultiIndex.from_product(
+            [regions, ["Households", "Exports: Total (fob)"]],
+            names=["region", "category"]
+        )
+    ).to_csv(MRIOT_path / "Y.txt", sep="\t")
+    x = rng.random(len(index))
+    # A sector without output, whose coefficients are set to zero
+    x[2] = 0
+    pd.DataFrame({"indout": x}, index=index).to_csv(
+        MRIOT_path / "x.txt", sep="\t"
+    )
+    pd.DataFrame(
+        rng.random((4, len(index))),
+        index=pd.MultiIndex.from_product(
+            [["Use", "Supply"], ["Coal", "Oil"]],
+            names=["stressor", "IEA_product"]
+        ),
+        columns=index
+    ).to_csv(energy_extension_path / "net_energy_use.tsv", sep="\t")
+
+
+def memory_mapped(df):
+    base = df.values
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return False
+
+
+def assert_same(tables, reference_tables):
+    for table, reference in zip(tables, reference_tables):
+        pd.testing.assert_frame_equal(table, reference, check_exact=True)
+
+
+# %%
+with tempfile.TemporaryDirectory() as directory:
+    data_path = Path(directory)
+    write_year(data_path, seed=1)
+    reference = read_exiobase(year, data_path, use_cache=False)
+
+    # The first read creates the cache, the second reads it
+    assert_same(read_exiobase(year, data_path), reference)
+    cached = read_exiobase(year, data_path)
+    assert_same(cached, reference)
+    assert memory_mapped(cached[0]) and memory_mapped(cached[1])
+    assert not memory_mapped(reference[0])
+
+    # Changed source files invalidate the cache (after a pause, so that
+    # their modification times differ)
+    time.sleep(0.01)
+    write_year(data_path, seed=2)
+    reference = read_exiobase(year, data_path, use_cache=False)
+    assert_same(read_exiobase(year, data_path), reference)
+    assert_same(read_exiobase(year, data_path), reference)
+print("read_exiobase: cached and text reads match")
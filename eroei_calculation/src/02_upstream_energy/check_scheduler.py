@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import os
+import numpy as np
+import scheduler
+
+# Check that run_years returns the results in the order of the years, with
+# a summary of each year, and that the peak memory of a year is its own,
+# not that of a larger year run earlier in the same process.
+# scheduler.py is the same in 02_upstream_energy and 03_biomass_footprint.
+years = [2011, 2012, 2013, 2014]
+large_year = 2012
+array_bytes = {2011: 10e6, 2012: 400e6, 2013: 10e6, 2014: 10e6}
+
+
+def calculate_year(year):
+    values = np.ones(int(array_bytes[year] / 8))
+    return year, values.sum()
+
+
+# %%
+for n_jobs in [1, 2]:
+    results, summary = scheduler.run_years(calculate_year, years, n_jobs)
+    assert [year for year, _ in results] == years
+    assert list(summary.index) == years
+    assert list(summary.columns) == ["seconds", "peak_memory_GB", "pid"]
+    if n_jobs != 1:
+        # The first year is run on its own to measure its peak memory
+        assert summary.loc[years[0], "pid"] == os.getpid()
+
+    if os.path.exists("/proc/self/clear_refs"):
+        peak = summary["peak_memory_GB"] * 1e9
+        small_years = [year for year in years if year != large_year]
+        assert (peak[large_year] - peak[small_years] > 300e6).all()
+    print(f"run_years with n_jobs={n_jobs}:")
+    print(summary.round(2))
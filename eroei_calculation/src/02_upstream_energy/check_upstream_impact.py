@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import numpy as np
+import pandas as pd
+from functions import UPSTREAM_OUTPUTS, UpstreamSession
+
+# Check UpstreamSession.upstream_impact (one LU factorisation and Schur
+# complements) against the calculation with two pseudo-inverses, for all
+# outputs, on a small random economy. Several queries share one session,
+# as in eroi_of_food_upstream.
+regions = ["AT", "BE", "DK"]
+sectors = ["Wheat", "Cattle", "N-fertiliser", "Steel", "Services"]
+tolerance = 1e-10
+rng = np.random.default_rng(0)
+index = pd.MultiIndex.from_product(
+    [regions, sectors], names=["region", "sector"]
+)
+A = pd.DataFrame(
+    rng.random((len(index), len(index))) / len(index),
+    index=index,
+    columns=index
+)
+Y = pd.DataFrame(
+    rng.random((len(index), 2 * len(regions))) - 0.2,
+    index=index,
+    columns=pd.MultiIndex.from_product(
+        [regions, ["Households", "Exports: Total (fob)"]],
+        names=["region", "category"]
+    )
+)
+S = pd.DataFrame(
+    rng.random((2, len(index))),
+    index=pd.Index(["Energy", "Land"], name="stressor"),
+    columns=index
+)
+queries = [
+    (["Wheat", "Cattle"], ["N-fertiliser"]),
+    (["Wheat", "Cattle"], []),
+    (["Steel"], ["N-fertiliser", "Services"]),
+]
+
+
+def upstream_impact_pinv(A, Y, S, target_sectors, cut_sectors,
+                         remove_negative_demand):
+    """All outputs as calculated before, with np.linalg.pinv."""
+    other_sectors = (
+        A.index.get_level_values("sector")
+        .drop(cut_sectors)
+        .drop(target_sectors)
+        .values
+    )
+    A = (
+        A
+        .drop(cut_sectors, axis=0, level=1)
+        .drop(cut_sectors, axis=1, level=1)
+    )
+    Y = (
+        Y
+        .drop(cut_sectors, axis=0, level=1)
+        .drop("Exports: Total (fob)", axis=1, level=1)
+    )
+    if remove_negative_demand:
+        Y = Y.clip(lower=0)
+    S = S.drop(cut_sectors, axis=1, level=1)
+
+    L_all_target = pd.DataFrame(
+        np.linalg.pinv(np.eye(len(A)) - A.values),
+        index=A.index,
+        columns=A.columns
+    ).drop(other_sectors, axis=1, level="sector")
+    A_target_other = (
+        A
+        .drop(other_sectors, axis=0, level="sector")
+        .drop(target_sectors, axis=1, level="sector")
+    )
+    A_other_other = (
+        A
+        .drop(target_sectors, axis=0, level="sector")
+        .drop(target_sectors, axis=1, level="sector")
+    )
+    L_other_other = pd.DataFrame(
+        np.linalg.pinv(np.eye(len(A_other_other)) - A_other_other.values),
+        index=A_other_other.index,
+        columns=A_other_other.columns
+    )
+    indirect_demand = A_target_other.dot(
+        L_other_other.dot(Y.drop(target_sectors, axis=0, level="sector"))
+    )
+    direct_demand = Y.drop(other_sectors, axis=0, level="sector")
+    total_demand = direct_demand + indirect_demand
+    upstream_production = L_all_target.dot(total_demand)
+    return {
+        "Final consumer perspective": S.dot(L_all_target.dot(total_demand)),
+        "Target perspective": S.dot(L_all_target.dot(pd.DataFrame(
+            np.diag(total_demand.sum(axis=1)),
+            index=total_demand.index,
+            columns=total_demand.index
+        ))),
+        "Producer perspective": S.dot(pd.DataFrame(
+            np.diag(upstream_production.sum(axis=1)),
+            index=upstream_production.index,
+            columns=upstream_production.index
+        )),
+        "Indirect demand": indirect_demand,
+        "Direct demand": direct_demand,
+        "Upstream production": upstream_production,
+    }
+
+
+# %%
+# The sectors of Y and S are matched to A by label, whatever their order
+inputs = {
+    "order of A": (Y, S),
+    "Y rows reversed": (Y.iloc[::-1], S),
+    "S columns reversed": (Y, S.iloc[:, ::-1]),
+}
+for order, (Y_input, S_input) in inputs.items():
+    session = UpstreamSession(A, Y_input, S_input)
+    for target_sectors, cut_sectors in queries:
+        for remove_negative_demand in [False, True]:
+            reference = upstream_impact_pinv(
+                A, Y, S, target_sectors, cut_sectors, remove_negative_demand
+            )
+            for outputs in [None, ["Target perspective"]]:
+                results = session.upstream_impact(
+                    target_sectors=target_sectors,
+                    cut_sectors=cut_sectors,
+                    remove_negative_demand=remove_negative_demand,
+                    outputs=outputs
+                )
+                assert list(results) == (outputs or UPSTREAM_OUTPUTS)
+                for name, result in results.items():
+                    assert result.index.equals(reference[name].index), name
+                    assert result.columns.equals(
+                        reference[name].columns
+                    ), name
+                    difference = (result - reference[name]).abs().max().max()
+                    assert difference <= tolerance, f"{name} differs"
+    print(f"upstream_impact ({order}): all outputs match the pseudo-inverses")
@@ -22,15 +22,260 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # %%
+import io
 import os
+import json
+import shutil
+import hashlib
+import tempfile
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
 import pandas as pd
 from pathlib import Path
 import numpy as np
+import scipy.linalg
 
 # TODO: add save path as argument
 # TODO: add function documentation
 # TODO: add input to change between product or flow version of energy data. 
 
+UPSTREAM_OUTPUTS = [
+    "Final consumer perspective",
+    "Target perspective",
+    "Producer perspective",
+    "Indirect demand",
+    "Direct demand",
+    "Upstream production",
+]
+
+
+class UpstreamSession():
+    """
+    EXIOBASE system of one year, factorised once for many upstream queries.
+
+    I - A is factorised once for the full, uncut economy. Cutting sectors
+    and splitting off target sectors both take blocks of I - A, whose
+    inverses follow from L = (I - A)^-1 by a Schur complement (a low-rank
+    Woodbury downdate):
+        (I - A)_kk^-1 = L_kk - L_kr L_rr^-1 L_rk
+    for kept sectors k and removed sectors r. Only the columns of L for
+    cut and target sectors are solved for, and they are cached, so every
+    query costs a few solves with the shared factorisation.
+
+    Parameters
+    ----------
+    A : pd.DataFrame
+        Technical coefficients.
+    Y : pd.DataFrame
+        Final demand, including the "Exports: Total (fob)" columns. Rows
+        are matched to A by label.
+    S : pd.DataFrame
+        Stressor coefficients. Columns are matched to A by label.
+    """
+
+    def __init__(self, A, Y, S):
+        self.A = A
+        # Sectors are selected by position below, so Y and S must be in the
+        # order of A
+        self.Y = (
+            Y
+            .reindex(A.index)
+            .drop("Exports: Total (fob)", axis=1, level=1)
+        )
+        self.S = S.reindex(columns=A.index)
+        self.sectors = A.index.get_level_values("sector")
+        self._lu = scipy.linalg.lu_factor(np.eye(len(A)) - A.values)
+        self._L_columns = {}
+        self._LY = {}
+
+    def final_demand(self, remove_negative_demand=False, total=False):
+        """
+        Final demand, optionally without negatives or summed over categories.
+        """
+        Y = self.Y
+        if remove_negative_demand:
+            Y = Y.clip(lower=0)
+        if total:
+            Y = Y.sum(axis=1).to_frame("Total")
+        return Y
+
+    def L_columns(self, positions):
+        """
+        Columns of L = (I - A)^-1 at the given positions, cached.
+        """
+        missing = [i for i in positions if i not in self._L_columns]
+        if missing:
+            unit = np.zeros((len(self.A), len(missing)))
+            unit[missing, np.arange(len(missing))] = 1
+            solved = scipy.linalg.lu_solve(self._lu, unit)
+            for n, i in enumerate(missing):
+                self._L_columns[i] = solved[:, n]
+        columns = np.empty((len(self.A), len(positions)))
+        for n, i in enumerate(positions):
+            columns[:, n] = self._L_columns[i]
+        return columns
+
+    def LY(self, remove_negative_demand=False, total=False):
+        key = (remove_negative_demand, total)
+        if key not in self._LY:
+            self._LY[key] = scipy.linalg.lu_solve(
+                self._lu,
+                self.final_demand(remove_negative_demand, total).values
+            )
+        return self._LY[key]
+
+    def upstream_impact(
+        self,
+        target_sectors: list = [],
+        cut_sectors: list = [],
+        remove_negative_demand: bool = False,
+        outputs: list = None
+    ):
+        """
+        Upstream impact of the target sectors in the economy without the
+        cut sectors.
+
+        Parameters
+        ----------
+        target_sectors : list, optional
+            Sectors whose upstream impact is calculated.
+        cut_sectors : list, optional
+            Sectors removed from the economy.
+        remove_negative_demand : BOOL, optional
+            Set negative final demand to zero. The default is False.
+        outputs : list, optional
+            Names of the results to calculate, out of UPSTREAM_OUTPUTS.
+            Only these and what they depend on are calculated. The default
+            None calculates all of them.
+
+        Returns
+        -------
+        results : dict
+            The requested results (pd.DataFrame) by name.
+        """
+        if outputs is None:
+            outputs = UPSTREAM_OUTPUTS
+        unknown = set(outputs) - set(UPSTREAM_OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown upstream_impact outputs: {unknown}")
+
+        # The target and producer perspectives only need total demand summed
+        # over final demand categories, so final demand is summed first and
+        # everything below is a chain of matrix-vector products.
+        total = not any(
+            name in outputs for name in [
+                "Final consumer perspective",
+                "Indirect demand",
+                "Direct demand",
+                "Upstream production",
+            ]
+        )
+
+        A = self.A
+        cut = self.sectors.isin(cut_sectors)
+        target = self.sectors.isin(target_sectors) & ~cut
+        keep = ~cut
+        other = keep & ~target
+
+        # Cut sectors from economy by dropping them from A, Y, and S.
+        Y_modified = self.final_demand(remove_negative_demand, total)
+        Y_values = Y_modified.values
+        Y_modified = Y_modified[keep]
+        S_modified = self.S.loc[:, keep]
+
+        # Columns of L for the target sectors in the cut economy:
+        #   L_all_target = L_kt - L_kc solve(L_cc, L_ct)
+        L_target = self.L_columns(np.flatnonzero(target))
+        L_cut = self.L_columns(np.flatnonzero(cut))
+        L_all_target = L_target[keep]
+        if cut.any():
+            L_all_target = L_all_target - L_cut[keep] @ np.linalg.solve(
+                L_cut[cut], L_target[cut]
+            )
+        L_all_target = pd.DataFrame(
+            L_all_target,
+            index=A.index[keep],
+            columns=A.columns[target],
+        )
+
+        Y_target_all = Y_modified[target[keep]]
+        A_target_other = pd.DataFrame(
+            A.values[np.ix_(target, other)],
+            index=A.index[target],
+            columns=A.columns[other],
+        )
+
+        # L_other_other = (I - A_other_other)^-1 with r = cut + target:
+        #   L_other_other = L_oo - L_or L_rr^-1 L_ro
+        # so with W = L [Y_other_all; 0] = L Y - L_r Y_r:
+        #   L_other_other Y_other_all = W_o - L_or solve(L_rr, W_r)
+        removed = np.flatnonzero(~other)
+        L_removed = self.L_columns(removed)
+        W = (
+            self.LY(remove_negative_demand, total)
+            - L_removed @ Y_values[removed]
+        )
+        L_other_other_Y = pd.DataFrame(
+            W[other]
+            - L_removed[other] @ np.linalg.solve(L_removed[~other], W[~other]),
+            index=A.index[other],
+            columns=Y_modified.columns,
+        )
+
+        # Calculate demands
+        indirect_demand = (
+            A_target_other.dot(L_other_other_Y)
+        )
+        direct_demand = (
+            Y_target_all
+        )
+        total_demand = (
+            direct_demand + indirect_demand
+        )
+        total_demand_sum = total_demand.sum(axis=1).values
+
+        results = {}
+        if "Indirect demand" in outputs:
+            results["Indirect demand"] = indirect_demand
+        if "Direct demand" in outputs:
+            results["Direct demand"] = direct_demand
+
+        # Calculate upstream production for producer perspective
+        if "Upstream production" in outputs:
+            results["Upstream production"] = (
+                L_all_target
+                .dot(total_demand)
+            )
+
+        # Calculate upstream impact. Diagonal matrices are applied as column
+        # scaling: S diag(d) = S * d and S L diag(d) = (S L) * d.
+        if (
+            "Final consumer perspective" in outputs
+            or "Target perspective" in outputs
+        ):
+            S_L = S_modified.dot(L_all_target)
+        if "Final consumer perspective" in outputs:
+            results["Final consumer perspective"] = (
+                S_L
+                .dot(total_demand)
+            )
+        if "Target perspective" in outputs:
+            results["Target perspective"] = pd.DataFrame(
+                S_L.values * total_demand_sum,
+                index=S_modified.index,
+                columns=total_demand.index,
+            )
+        if "Producer perspective" in outputs:
+            results["Producer perspective"] = pd.DataFrame(
+                S_modified.values * (L_all_target.values @ total_demand_sum),
+                index=S_modified.index,
+                columns=L_all_target.index,
+            )
+
+        return {name: results[name] for name in outputs}
+
 
 def upstream_impact(
     A: pd.DataFrame,
@@ -38,155 +283,244 @@ def upstream_impact(
     S: pd.DataFrame,
     target_sectors: list = [],
     cut_sectors: list = [],
-    remove_negative_demand: bool = False
+    remove_negative_demand: bool = False,
+    outputs: list = None
 ):
-    # Extracting a list with the names of sectors not target or cut.
-    all_sectors = A.index.get_level_values("sector")
-    other_sectors = (
-        all_sectors
-        .drop(cut_sectors)
-        .drop(target_sectors)
-        .values
+    return UpstreamSession(A, Y, S).upstream_impact(
+        target_sectors=target_sectors,
+        cut_sectors=cut_sectors,
+        remove_negative_demand=remove_negative_demand,
+        outputs=outputs,
     )
 
-    # Cut sectors from economy by setting them to zero in A, Y, and S.
-    A_modified = (
-        A
-        .drop(cut_sectors, axis=0, level=1)
-        .drop(cut_sectors, axis=1, level=1)
-    )
-    Y_modified = (
-        Y
-        .drop(cut_sectors, axis=0, level=1)
-        .drop("Exports: Total (fob)", axis=1, level=1)
-    )
-    if remove_negative_demand:
-        Y_modified[Y_modified < 0] = 0
 
-    S_modified = (
-        S
-        .drop(cut_sectors, axis=1, level=1)
-    )
+def _file_hash(file_path, chunk_size=2**26):
+    """SHA-256 of a file, read in chunks."""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
 
-    # Calculate modified L
-    I = pd.DataFrame(
-        np.eye(len(A_modified)),
-        index=A_modified.index,
-        columns=A_modified.columns,
-    )
-    L_modified = pd.DataFrame(
-        np.linalg.pinv(I-A_modified),
-        index=A_modified.index,
-        columns=A_modified.columns,
-    )
-
-    # Define all, but the L_other_other matrix
-    L_all_target = (
-        L_modified
-        .drop(other_sectors, axis=1, level="sector")
-    )
-    Y_target_all = (
-        Y_modified
-        .drop(other_sectors, axis=0, level="sector")
-    )
-    A_target_other = (
-        A_modified
-        .drop(other_sectors, axis=0, level="sector")
-        .drop(target_sectors, axis=1, level="sector")
-    )
-    Y_other_all = (
-        Y_modified
-        .drop(target_sectors, axis=0, level="sector")
-    )
 
-    A_other_other = (
-        A_modified
-        .drop(target_sectors, axis=0, level="sector")
-        .drop(target_sectors, axis=1, level="sector")
-    )
+def _labels_to_json(index):
+    return index.to_frame(index=False).to_json(orient="split", index=False)
 
-    # Calculate modified L for other sectors
-    I_other_other = pd.DataFrame(
-        np.eye(len(A_other_other)),
-        index=A_other_other.index,
-        columns=A_other_other.columns,
-    )
-    L_other_other = pd.DataFrame(
-        np.linalg.pinv(I_other_other-A_other_other),
-        index=A_other_other.index,
-        columns=A_other_other.columns,
-    )
 
-    # Calculate demands
-    indirect_demand = (
-        A_target_other.dot(L_other_other.dot(Y_other_all))
-    )
-    direct_demand = (
-        Y_target_all
+def _labels_from_json(labels):
+    labels = pd.read_json(
+        io.StringIO(labels), orient="split", dtype=False, convert_dates=False
     )
-    total_demand = (
-        direct_demand + indirect_demand
+    if labels.shape[1] == 1:
+        return pd.Index(labels.iloc[:, 0])
+    return pd.MultiIndex.from_frame(labels)
+
+
+def _write_json(file_path, data):
+    """Write a JSON file atomically, so that readers never see it half-written.
+    """
+    descriptor, tmp_path = tempfile.mkstemp(dir=file_path.parent)
+    with os.fdopen(descriptor, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, file_path)
+
+
+def _cache_dir(cache_dir, sources):
+    """
+    Cache folder of a set of source files, validated against the sources.
+
+    The cache key is the size, modification time and SHA-256 hash of each
+    source file. A hash is only recomputed when the size or modification time
+    changed, and stale entries are removed. Parallel workers validate the
+    folder one at a time (where file locks are available), so that only the
+    first removes stale entries and none removes the entries of another.
+
+    Parameters
+    ----------
+    cache_dir : Path
+        Cache folder.
+    sources : dict
+        Source file paths by name.
+
+    Returns
+    -------
+    cache_dir : Path
+    """
+    key_path = cache_dir / "source.json"
+
+    os.makedirs(cache_dir.parent, exist_ok=True)
+    with open(cache_dir.parent / f"{cache_dir.name}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        cached_keys = {}
+        if key_path.exists():
+            with open(key_path) as file:
+                cached_keys = json.load(file)
+
+        keys = {}
+        stale = False
+        for name, source_path in sources.items():
+            stat = os.stat(source_path)
+            key = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            cached_key = cached_keys.get(name, {})
+            if (
+                cached_key.get("size") != key["size"]
+                or cached_key.get("mtime") != key["mtime"]
+            ):
+                key["hash"] = _file_hash(source_path)
+                if (
+                    cached_key.get("size") != key["size"]
+                    or cached_key.get("hash") != key["hash"]
+                ):
+                    stale = True
+            else:
+                key["hash"] = cached_key.get("hash")
+            keys[name] = key
+
+        if stale:
+            print(f"Creating binary cache for {cache_dir}")
+            # Without a key there is nothing stale to remove yet
+            if cached_keys:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        if keys != cached_keys:
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_json(key_path, keys)
+
+    return cache_dir
+
+
+def _cache_load(entry_path, names):
+    """
+    Memory-map the tables of a cache entry.
+
+    Returns None if the entry does not exist.
+    """
+    if not entry_path.is_dir():
+        return None
+    with open(entry_path / "labels.json") as file:
+        labels = json.load(file)
+
+    tables = {}
+    for name in names:
+        values = np.load(entry_path / f"{name}.npy", mmap_mode="r")
+        index = _labels_from_json(labels[name]["index"])
+        if labels[name]["columns"] is None:
+            tables[name] = pd.Series(
+                values, index=index, name=labels[name]["name"], copy=False
+            )
+        else:
+            tables[name] = pd.DataFrame(
+                values,
+                index=index,
+                columns=_labels_from_json(labels[name]["columns"]),
+                copy=False
+            )
+    return tables
+
+
+def _cache_save(entry_path, tables):
+    """
+    Write the tables of a cache entry as raw .npy files and their labels.
+
+    The entry is written to a temporary folder and moved into place, so that
+    parallel workers never see half-written entries.
+    """
+    os.makedirs(entry_path.parent, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(dir=entry_path.parent))
+    labels = {}
+    for name, table in tables.items():
+        np.save(
+            tmp_path / f"{name}.npy",
+            np.ascontiguousarray(table.values, dtype=np.float64)
+        )
+        labels[name] = {
+            "index": _labels_to_json(table.index),
+            "columns": (
+                _labels_to_json(table.columns)
+                if isinstance(table, pd.DataFrame)
+                else None
+            ),
+            "name": table.name if isinstance(table, pd.Series) else None,
+        }
+    with open(tmp_path / "labels.json", "w") as file:
+        json.dump(labels, file)
+    try:
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        # Another process wrote the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _read_exiobase_text(sources):
+    """
+    Parse the EXIOBASE text files of a year.
+
+    Parameters
+    ----------
+    sources : dict
+        Paths of the A, Y, x and F source files.
+
+    Returns
+    -------
+    tables : dict
+        A, Y, F (pd.DataFrame) and x (pd.Series).
+    """
+    A = pd.read_csv(
+        sources["A"],
+        sep="\t",
+        index_col=[0, 1],
+        header=[0, 1]
     )
 
-    # Calculate upstream production for producer perspective
-    upstream_production = (
-        L_all_target
-        .dot(total_demand)
+    Y = pd.read_csv(
+        sources["Y"],
+        sep="\t",
+        index_col=[0, 1],
+        header=[0, 1]
     )
 
-    # Diagonalise for target and producer perspective
-    total_demand_diag = pd.DataFrame(
-        np.diag(total_demand.sum(axis=1)),
-        index=total_demand.index,
-        columns=total_demand.index
-    )
-    upstream_production_diag = pd.DataFrame(
-        np.diag(upstream_production.sum(axis=1)),
-        index=upstream_production.index,
-        columns=upstream_production.index
-    )
+    x = pd.read_csv(
+        sources["x"],
+        sep="\t",
+        index_col=[0, 1],
+        header=[0]
+    ).loc[:, "indout"]
 
-    # Calculate upstream impact
-    final_consumer_perspective = (
-        S_modified
-        .dot(
-            L_all_target
-            .dot(total_demand)
-        )
-    )
-    target_perspective = (
-        S_modified
-        .dot(
-            L_all_target
-            .dot(total_demand_diag)
-        )
-    )
-    producer_perspective = (
-        S_modified
-        .dot(upstream_production_diag)
+    F = pd.read_csv(
+        sources["F"],
+        sep="\t",
+        index_col=[0, 1],
+        header=[0, 1]
     )
 
-    results = {
-        "Final consumer perspective": final_consumer_perspective,
-        "Target perspective": target_perspective,
-        "Producer perspective": producer_perspective,
-        "Indirect demand": indirect_demand,
-        "Direct demand": direct_demand,
-        "Upstream production": upstream_production
-    }
-
-    return results
-
-
-def eroi_of_food_upstream(
-    year,
-    data_path,
-    include_fertiliser=True,
-    agriculture_products=[],
-    fertiliser_products=[],
-    processed_products=[],
-):
-
+    return {"A": A, "Y": Y, "x": x, "F": F}
+
+
+def read_exiobase(year, data_path, cache_path=None, use_cache=True):
+    """
+    Read A, Y and the energy stressor coefficients S of an EXIOBASE year.
+
+    The first read of a year converts A, Y, x and the energy extension F to
+    a binary cache of .npy files, which later reads memory-map instead of
+    parsing the text files. The cache is invalidated when a source file
+    changes.
+
+    Parameters
+    ----------
+    year : INT
+        EXIOBASE year.
+    data_path : Path
+        Data folder with the EXIOBASE subfolder.
+    cache_path : Path, optional
+        Folder of the binary cache. Defaults to EXIOBASE/cache in data_path.
+    use_cache : BOOL, optional
+        Read through the binary cache. The default is True.
+
+    Returns
+    -------
+    A, Y, S : pd.DataFrame
+    """
     MRIOT_path = (
         data_path
         / "EXIOBASE"
@@ -204,79 +538,46 @@ def eroi_of_food_upstream(
         / f"IOT_{year}_pxp"
     )
 
-    A = pd.read_csv(
-        MRIOT_path / "A.txt",
-        sep="\t",
-        index_col=[0, 1],
-        header=[0, 1]
-    )
+    sources = {
+        "A": MRIOT_path / "A.txt",
+        "Y": MRIOT_path / "Y.txt",
+        "x": MRIOT_path / "x.txt",
+        "F": energy_extension_path / "net_energy_use.tsv",
+    }
 
-    Y = pd.read_csv(
-        MRIOT_path / "Y.txt",
-        sep="\t",
-        index_col=[0, 1],
-        header=[0, 1]
-    )
+    tables = None
+    if use_cache:
+        if cache_path is None:
+            cache_path = data_path / "EXIOBASE" / "cache"
+        entry_path = _cache_dir(
+            Path(cache_path) / f"IOT_{year}_pxp", sources
+        ) / "tables"
+        tables = _cache_load(entry_path, list(sources))
 
-    x = pd.read_csv(
-        MRIOT_path / "x.txt",
-        sep="\t",
-        index_col=[0, 1],
-        header=[0]
-    ).loc[:, "indout"]
+    if tables is None:
+        tables = _read_exiobase_text(sources)
+        if use_cache:
+            _cache_save(entry_path, tables)
 
-    F = pd.read_csv(
-        energy_extension_path / "net_energy_use.tsv",
-        sep="\t",
-        index_col=[0, 1],
-        header=[0, 1]
-    )
+    A, Y, x, F = (tables[name] for name in ["A", "Y", "x", "F"])
 
     F_agg = F.groupby(by=["IEA_product"], axis=0).sum()
 
     S = F_agg.div(x, axis=1).replace([np.nan, np.inf, -np.inf], 0)
 
+    return A, Y, S
 
-    if include_fertiliser:
-        primary_production = upstream_impact(
-            A,
-            Y,
-            S,
-            target_sectors=agriculture_products,
-            remove_negative_demand=False
-        )
-
-        processed_production = upstream_impact(
-            A,
-            Y,
-            S,
-            target_sectors=processed_products,
-            cut_sectors=agriculture_products,
-            remove_negative_demand=False
-        )
-        suffix = "_incl_fertiliser"
-
-    else:
-        primary_production = upstream_impact(
-            A,
-            Y,
-            S,
-            target_sectors=agriculture_products,
-            cut_sectors=fertiliser_products,
-            remove_negative_demand=False
-        )
 
-        processed_production = upstream_impact(
-            A,
-            Y,
-            S,
-            target_sectors=processed_products,
-            cut_sectors=agriculture_products + fertiliser_products,
-            remove_negative_demand=False
-        )
+def eroi_of_food_upstream(
+    year,
+    data_path,
+    fertiliser_variants=[True, False],
+    agriculture_products=[],
+    fertiliser_products=[],
+    processed_products=[],
+):
+    A, Y, S = read_exiobase(year, data_path)
 
-        suffix = ""
-    
     save_path = (
         data_path
         / "interim"
@@ -287,22 +588,46 @@ def eroi_of_food_upstream(
     )
     os.makedirs(save_path, exist_ok=True)
 
-    (
-        primary_production["Target perspective"]
-        .groupby(level="IEA_product")
-        .sum()
-        .to_csv(
-            save_path / f"primary_crops_product{suffix}.tsv",
-            sep="\t",
+    # Every variant and product group is a query on the same factorisation.
+    session = UpstreamSession(A, Y, S)
+    for include_fertiliser in fertiliser_variants:
+        if include_fertiliser:
+            cut_products = []
+            suffix = "_incl_fertiliser"
+        else:
+            cut_products = fertiliser_products
+            suffix = ""
+
+        primary_production = session.upstream_impact(
+            target_sectors=agriculture_products,
+            cut_sectors=cut_products,
+            remove_negative_demand=False,
+            outputs=["Target perspective"]
         )
-    )
 
-    (
-        processed_production["Target perspective"]
-        .groupby(level="IEA_product")
-        .sum()
-        .to_csv(
-            save_path / f"processed_food_product{suffix}.tsv",
-            sep="\t"
+        processed_production = session.upstream_impact(
+            target_sectors=processed_products,
+            cut_sectors=agriculture_products + cut_products,
+            remove_negative_demand=False,
+            outputs=["Target perspective"]
+        )
+
+        (
+            primary_production["Target perspective"]
+            .groupby(level="IEA_product")
+            .sum()
+            .to_csv(
+                save_path / f"primary_crops_product{suffix}.tsv",
+                sep="\t",
+            )
+        )
+
+        (
+            processed_production["Target perspective"]
+            .groupby(level="IEA_product")
+            .sum()
+            .to_csv(
+                save_path / f"processed_food_product{suffix}.tsv",
+                sep="\t"
+            )
         )
-    )
@@ -23,19 +23,40 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # %%
 import os
+import time
+import logging
+import argparse
 import pandas as pd
 from pathlib import Path
 import numpy as np
-from tqdm import tqdm
-from joblib import Parallel, delayed
+from functools import partial
 from functions import eroi_of_food_upstream
+from scheduler import run_years
 
 # %%
 years = np.arange(1995, 2021)
 data_path = Path("../../data")
-include_fertiliser = True
-run_parallel = True
-n_cpus = 26
+fertiliser_variants = [True, False]
+
+# Years calculated in parallel (1: sequential, -1: as many as the memory
+# allows). Can be set with --jobs on the command line.
+n_jobs = -1
+# Peak memory of one year in bytes. None measures it on the first year.
+year_memory = None
+
+# parse_known_args, so that the cells also run in interactive sessions
+parser = argparse.ArgumentParser(description="Upstream energy use of food.")
+parser.add_argument(
+    "--jobs", type=int, default=n_jobs,
+    help="Years calculated in parallel (-1: as many as memory allows)."
+)
+n_jobs = parser.parse_known_args()[0].jobs
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+logger = logging.getLogger("02_upstream_energy")
 
 # %%
 # ? Include "Tobacco" and "Wool, silk worm cocoons"?
@@ -80,34 +101,32 @@ processed_products = [
 
 # %%
 if __name__ == "__main__":
+    start = time.perf_counter()
+    _, summary = run_years(
+        partial(
+            eroi_of_food_upstream,
+            data_path=data_path,
+            fertiliser_variants=fertiliser_variants,
+            agriculture_products=agriculture_products,
+            fertiliser_products=fertiliser_products,
+            processed_products=processed_products
+        ),
+        years,
+        n_jobs=n_jobs,
+        year_memory=year_memory,
+        logger=logger
+    )
 
-    if run_parallel:
-        (
-            Parallel(n_jobs=n_cpus)
-            (delayed(eroi_of_food_upstream)(year, **kwargs)
-            for (
-                year,
-                kwargs,
-            ) in zip(
-                years,
-                [{
-                    "data_path": data_path,
-                    "include_fertiliser": include_fertiliser,
-                    "agriculture_products": agriculture_products,
-                    "fertiliser_products": fertiliser_products,
-                    "processed_products": processed_products
-                }]*len(years)
-            ))
-        )
-    else:
-        for year in tqdm(years):
-            eroi_of_food_upstream(
-                year=year,
-                data_path=data_path,
-                include_fertiliser=include_fertiliser,
-                agriculture_products=agriculture_products,
-                fertiliser_products=fertiliser_products,
-                processed_products=processed_products
-            )
+    # Wall time and peak memory of each year
+    summary_path = (
+        data_path
+        / "interim"
+        / "upstream_energy_use"
+        / "run_summary.tsv"
+    )
+    os.makedirs(summary_path.parent, exist_ok=True)
+    summary.to_csv(summary_path, sep="\t")
+    logger.info("Run summary saved to %s", summary_path)
+    logger.info("Total wall time: %.0f s", time.perf_counter() - start)
 
 # %%
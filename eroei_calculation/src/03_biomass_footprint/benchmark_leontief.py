@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import fabio_functions
+import functions
+import scheduler
+
+# Compare the sparse LU Leontief solve, which never builds L, with the
+# dense np.linalg.inv followed by products with L, and with gmres
+# preconditioned by the factorisation of the previous year. All compute the
+# production for Y_iso3c, as 03 does with footprint_mode = "production",
+# and the aggregated footprints of all regions, as with footprint_mode =
+# "aggregated" (for which gmres factorises the year first). Each method
+# runs in a fresh process so that peak RSS is its own.
+year = 2013
+data_path = Path("../../data")
+fabio_path = (
+    data_path
+    / "raw"
+    / "FABIO"
+    / "biomass"
+)
+final_demand_categories = [
+    "balancing",
+    "food",
+    "losses",
+    "other",
+    "stock_addition",
+    "tourist",
+    "unspecified"
+]
+# Largest footprint difference allowed, relative to the largest footprint
+tolerance = 1e-6
+# Regions whose aggregated footprints are compared between the methods
+compared_regions = 5
+
+
+# %%
+def load(year):
+    reader = fabio_functions.read(path=fabio_path, year=year, version=1.2)
+    Z = reader.Z(version="mass", sparse=True)
+    Y_iso3c = reader.Y(
+        final_demand=final_demand_categories,
+        aggregate=["iso3c"]
+    )
+    x = Y_iso3c.sum(axis=1) + Z.sum(axis=1)
+    A = Z.div(x, axis=1).matrix.tocsc()
+    functions.repair_diagonal(A)
+    return A, Y_iso3c
+
+
+def run(method, queue):
+    # gmres is preconditioned with the factorisation of the previous year,
+    # which is not timed
+    previous = None
+    if method == "gmres":
+        previous = functions.LeontiefSolver(load(year - 1)[0])
+    A, Y_iso3c = load(year)
+    codes, groups = functions.group_codes(
+        Y_iso3c.index, ["item", "comm_group", "group"]
+    )
+    result = {"peak RSS after load [GB]": scheduler.peak_memory() / 1e9}
+
+    # The dense method needs L, the others solve with the factorisation
+    start = time.perf_counter()
+    solver = functions.LeontiefSolver(A, method=method, previous=previous)
+    L = solver.inverse() if method == "dense" else solver
+    result["factorise or invert [s]"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    production = solver.solve(Y_iso3c.to_numpy())
+    result["production L Y [s]"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    footprints = []
+    for region in range(Y_iso3c.shape[1]):
+        footprint = functions.aggregated_footprint(
+            L, Y_iso3c.iloc[:, region], codes, len(groups)
+        )
+        if region < compared_regions:
+            footprints.append(footprint)
+    result["aggregated footprints [s]"] = time.perf_counter() - start
+    result["peak RSS [GB]"] = scheduler.peak_memory() / 1e9
+
+    queue.put((result, production, np.stack(footprints)))
+
+
+# %%
+if __name__ == "__main__":
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    outputs = {}
+    for method in ["dense", "splu", "gmres"]:
+        queue = context.Queue()
+        process = context.Process(target=run, args=(method, queue))
+        process.start()
+        results[method], *outputs[method] = queue.get()
+        process.join()
+
+    # All methods must give the same production and footprints
+    differences = []
+    for method in ["splu", "gmres"]:
+        for dense, other in zip(outputs["dense"], outputs[method]):
+            difference = np.abs(other - dense).max() / np.abs(dense).max()
+            assert difference <= tolerance, "Results differ between methods"
+            differences.append(difference)
+
+    benchmark = pd.DataFrame(results).rename_axis("step")
+    benchmark["ratio dense/splu"] = benchmark["dense"] / benchmark["splu"]
+    benchmark["ratio gmres/splu"] = benchmark["gmres"] / benchmark["splu"]
+    print(benchmark.round(3))
+    print("Largest relative difference:", max(differences))
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import sys
+import time
+import subprocess
+import pandas as pd
+from pathlib import Path
+import fabio_functions
+
+# Compare the built-in RDS reader with the rpy2 (embedded R) reader.
+# The binary cache is disabled, so both backends parse the RDS files.
+year = 2013
+data_path = Path("../../data")
+fabio_path = (
+    data_path
+    / "raw"
+    / "FABIO"
+    / "biomass"
+)
+
+
+# %%
+def time_worker_start(backend):
+    """Time a fresh interpreter importing fabio_functions and creating a
+    reader, as a joblib/multiprocessing worker would."""
+    code = (
+        "import fabio_functions;"
+        f"fabio_functions.read(path={str(fabio_path)!r}, year={year}, "
+        f"version=1.2, use_cache=False, backend={backend!r})"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def time_matrices(backend):
+    timings = {}
+    start = time.perf_counter()
+    reader = fabio_functions.read(
+        path=fabio_path,
+        year=year,
+        version=1.2,
+        use_cache=False,
+        backend=backend
+    )
+    timings["reader"] = time.perf_counter() - start
+
+    matrices = {}
+    for name, method in [
+        ("Z", lambda: reader.Z(version="mass", sparse=True).matrix),
+        ("Y", lambda: reader.Y(sparse=True).matrix),
+        ("X", lambda: reader.X().values),
+    ]:
+        start = time.perf_counter()
+        matrices[name] = method()
+        timings[name] = time.perf_counter() - start
+
+    return timings, matrices
+
+
+# %%
+results = {}
+matrices = {}
+for backend in ["python", "rpy2"]:
+    results[backend], matrices[backend] = time_matrices(backend)
+    results[backend]["worker start"] = time_worker_start(backend)
+
+# Both backends must give the same matrices
+for name in matrices["python"]:
+    difference = matrices["python"][name] - matrices["rpy2"][name]
+    assert abs(difference).max() == 0, f"{name} differs between backends"
+
+benchmark = pd.DataFrame(results).rename_axis("step")
+benchmark["speed-up"] = benchmark["rpy2"] / benchmark["python"]
+print(benchmark.round(3))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import fabio_functions
+
+# Check that footprints saved with save_footprint_long() are read back by
+# read_footprint_long() with the same values and labels, including the
+# dtype of each label level, and that filters select the right entries.
+rng = np.random.default_rng(0)
+index = pd.MultiIndex.from_product(
+    [[1, 2, 3], ["item 1", "item 2"]],
+    names=["area_code_output", "item_output"]
+)
+columns = pd.MultiIndex.from_product(
+    [[10, 20], ["item 1", "item 2", "item 3"]], names=["area_code", "item"]
+)
+df = pd.DataFrame(rng.random((6, 6)), index=index, columns=columns)
+# Entries dropped when saving
+df.iloc[0, :] = 0
+df.iloc[1, 2] = 1e-9
+epsilon = 1e-6
+
+# %%
+with tempfile.TemporaryDirectory() as directory:
+    file_path = Path(directory) / "AAA.parquet"
+    fabio_functions.save_footprint_long(df, file_path, epsilon=epsilon)
+
+    expected = df.where(df.abs() > epsilon, 0)
+    pd.testing.assert_frame_equal(
+        fabio_functions.read_footprint_long(file_path, wide=True), expected
+    )
+
+    long = fabio_functions.read_footprint_long(file_path)
+    assert len(long) == (expected != 0).sum().sum()
+    for name in index.names + columns.names:
+        labels = index if name in index.names else columns
+        assert long[name].dtype == "category"
+        assert (
+            long[name].cat.categories.dtype
+            == labels.get_level_values(name).dtype
+        )
+
+    filtered = fabio_functions.read_footprint_long(
+        file_path,
+        filters=[("area_code_output", "==", 2), ("item", "==", "item 3")]
+    )
+    reference = expected.loc[2, (slice(None), "item 3")]
+    assert len(filtered) == (reference != 0).sum().sum()
+    assert np.isclose(filtered["value"].sum(), reference.sum().sum())
+    print("save_footprint_long/read_footprint_long: round trips match")
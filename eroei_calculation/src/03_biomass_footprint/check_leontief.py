@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import functions
+
+# Check LeontiefSolver and aggregated_footprint() against the dense inverse
+# np.linalg.inv(I - A), on a random sparse A, and the iterative methods,
+# preconditioned with the previous year, against the sparse LU.
+n = 60
+tolerance = 1e-10
+rng = np.random.default_rng(0)
+index = pd.MultiIndex.from_arrays(
+    [
+        np.repeat(["AAA", "BBB", "CCC"], n // 3),
+        np.tile([f"item {i % 5}" for i in range(n // 3)], 3),
+        np.tile([f"group {i % 2}" for i in range(n // 3)], 3),
+    ],
+    names=["area", "item", "group"]
+)
+# Column sums of at most 0.5, so that I - A is invertible
+A = scipy.sparse.random(n, n, density=0.1, random_state=1, format="csc")
+A = A @ scipy.sparse.diags(0.5 / np.maximum(A.sum(axis=0).A1, 1))
+Y = pd.DataFrame(
+    rng.random((n, 3)) - 0.2,
+    index=index,
+    columns=pd.Index(["AAA", "BBB", "CCC"], name="iso3c")
+)
+L_reference = np.linalg.inv(np.eye(n) - A.toarray())
+
+
+def difference(result, reference):
+    return np.abs(np.asarray(result) - reference).max()
+
+
+# %%
+codes, groups = functions.group_codes(index, ["item", "group"])
+for method in ["splu", "dense"]:
+    solver = functions.LeontiefSolver(A, method=method, index=index)
+
+    X = solver.solve(Y)
+    assert X.index.equals(Y.index) and X.columns.equals(Y.columns)
+    assert difference(X, L_reference @ Y.values) < tolerance
+
+    positions = np.array([3, 0, 59, 17])
+    L_columns = solver.columns(positions)
+    assert difference(L_columns, L_reference[:, positions]) < tolerance
+
+    L = solver.inverse()
+    assert L.index.equals(index) and L.columns.equals(index)
+    assert difference(L, L_reference) < tolerance
+
+    for region in Y.columns:
+        reference = (
+            pd.DataFrame(
+                L_reference * Y[region].values, index=index, columns=index
+            )
+            .T.groupby(level=["item", "group"]).sum().T
+        )
+        assert groups.equals(reference.columns)
+        assert difference(
+            functions.aggregated_footprint(
+                solver, Y[region], codes, len(groups)
+            ),
+            reference.values
+        ) < tolerance
+    print(f"{method}: solve, columns, inverse and footprints match")
+
+# %%
+# Next year: the same structure with slightly different coefficients
+A_next = A.copy()
+A_next.data *= rng.uniform(0.95, 1.05, A_next.nnz)
+L_next = np.linalg.inv(np.eye(n) - A_next.toarray())
+previous = functions.LeontiefSolver(A, index=index)
+for method in ["gmres", "bicgstab"]:
+    solver = functions.LeontiefSolver(
+        A_next, method=method, previous=previous, tolerance=1e-12,
+        index=index
+    )
+    X = solver.solve(Y)
+    assert difference(X, L_next @ Y.values) < 1e-8
+    assert len(solver.residuals) == Y.shape[1]
+    assert max(solver.residuals) < 1e-10 and not solver.fallback
+    # Many right-hand sides factorise the year first
+    assert difference(solver.inverse(), L_next) < tolerance
+    assert difference(solver.solve(Y), L_next @ Y.values) < tolerance
+    print(f"{method}: warm-started solves match")
+
+    # A tolerance of 0 is never reached: the first solve falls back to the
+    # factorisation, which the remaining right-hand sides use directly
+    solver = functions.LeontiefSolver(
+        A_next, method=method, previous=previous, tolerance=0, index=index
+    )
+    X = solver.solve(Y)
+    assert solver.fallback and len(solver.residuals) == 1
+    assert solver.residuals[0] < 1e-12
+    assert difference(X, L_next @ Y.values) < tolerance
+    print(f"{method}: falls back to the factorisation")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import tempfile
+import pyarrow as pa
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import fabio_functions
+
+# Check that matrices saved with save_matrix() are loaded back by
+# load_matrix() with the same values and labels, and without copying when
+# saved uncompressed in a single record batch.
+rng = np.random.default_rng(0)
+index = pd.MultiIndex.from_product(
+    [[1, 2, 3], ["item 1", "item 2"]], names=["area_code", "item"]
+)
+df = pd.DataFrame(
+    rng.random((6, 5)) - 0.5,
+    index=index,
+    columns=pd.Index(["AAA", "BBB", "CCC", "DDD", "EEE"], name="iso3c")
+)
+
+# %%
+with tempfile.TemporaryDirectory() as directory:
+    for compression in [None, "zstd", "lz4"]:
+        for chunk_columns in [1024, 2]:
+            file_path = Path(directory) / f"{compression}_{chunk_columns}"
+            fabio_functions.save_matrix(
+                df,
+                file_path,
+                compression=compression,
+                chunk_columns=chunk_columns
+            )
+            allocated = pa.total_allocated_bytes()
+            loaded = fabio_functions.load_matrix(file_path)
+            allocated = pa.total_allocated_bytes() - allocated
+            pd.testing.assert_frame_equal(loaded, df, check_exact=True)
+            assert loaded.values.flags.f_contiguous
+            if compression is None and chunk_columns >= df.shape[1]:
+                # A read-only view on the memory-mapped file
+                assert not loaded.values.flags.writeable
+                assert allocated < df.values.nbytes
+            del loaded
+    print("save_matrix/load_matrix: round trips match")
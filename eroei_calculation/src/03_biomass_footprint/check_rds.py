@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import gzip
+import struct
+import tempfile
+import numpy as np
+from pathlib import Path
+import fabio_functions
+
+# Check read_rds() on a known file: the serialisation that saveRDS() writes
+# for list(`2013` = c(a = 1.5, b = NA), n = 1:3, m = matrix(1:4 + 0.5, 2),
+# w = <c(0.5, 2.5) in a wrap_real ALTREP>, Z = <2 x 3 dgCMatrix>), spelled
+# out word by word (R serialisation format version 3).
+
+
+def word(value):
+    return struct.pack(">i", value)
+
+
+def string(value):
+    # CHARSXP of ASCII text
+    return word(0x00040009) + word(len(value)) + value.encode("ascii")
+
+
+rds = b"".join([
+    b"X\n",
+    word(3),  # Serialisation format version
+    word(0x00040201),  # Written by R 4.2.1
+    word(0x00030500),  # Readable from R 3.5.0
+    word(5), b"UTF-8",  # Native encoding
+    word(0x00000213), word(5),  # List (VECSXP) with attributes, length 5
+    # `2013` = c(a = 1.5, b = NA): REALSXP with attributes
+    word(0x0000020e), word(2),
+    struct.pack(">d", 1.5), bytes.fromhex("7ff00000000007a2"),  # NA_real_
+    word(0x00000402), word(0x00000001), string("names"),  # Tag, symbol 1
+    word(0x00000010), word(2), string("a"), string("b"),
+    word(0x000000fe),  # End of the attributes
+    # n = 1:3: ALTREP compact_intseq
+    word(0x000000ee),
+    word(0x00000002), word(0x00000001), string("compact_intseq"),  # Symbol 2
+    word(0x00000002), word(0x00000001), string("base"),  # Symbol 3
+    word(0x00000002), word(0x0000000d), word(1), word(13),  # INTSXP
+    word(0x000000fe),
+    word(0x0000000e), word(3),  # State: length, start and step
+    struct.pack(">3d", 3, 1, 1),
+    word(0x000000fe),  # No attributes
+    # m = matrix(1:4 + 0.5, 2): REALSXP with a dim attribute
+    word(0x0000020e), word(4), struct.pack(">4d", 1.5, 2.5, 3.5, 4.5),
+    word(0x00000402), word(0x00000001), string("dim"),  # Symbol 4
+    word(0x0000000d), word(2), word(2), word(2),
+    word(0x000000fe),
+    # w: wrap_real ALTREP, whose state is the pairlist (vector, metadata)
+    word(0x000000ee),
+    word(0x00000002), word(0x00000001), string("wrap_real"),  # Symbol 5
+    word(0x00000002), word(0x000003ff),  # Reference to symbol 3 (base)
+    word(0x00000002), word(0x0000000d), word(1), word(14),  # REALSXP
+    word(0x000000fe),
+    word(0x00000002), word(0x0000000e), word(2), struct.pack(">2d", 0.5, 2.5),
+    word(0x00000002), word(0x0000000d), word(2), word(1), word(1),
+    word(0x000000fe),
+    word(0x000000fe),  # No attributes
+    # Z: dgCMatrix, an S4 object whose slots are its attributes
+    word(0x00010319),
+    word(0x00000402), word(0x00000001), string("i"),  # Symbol 6
+    word(0x0000000d), word(3), word(0), word(0), word(1),
+    word(0x00000402), word(0x00000001), string("p"),  # Symbol 7
+    word(0x0000000d), word(4), word(0), word(1), word(1), word(3),
+    word(0x00000402), word(0x00000001), string("Dim"),  # Symbol 8
+    word(0x0000000d), word(2), word(2), word(3),
+    word(0x00000402), word(0x00000001), string("Dimnames"),  # Symbol 9
+    word(0x00000013), word(2), word(0x000000fe), word(0x000000fe),
+    word(0x00000402), word(0x00000001), string("x"),  # Symbol 10
+    word(0x0000000e), word(3), struct.pack(">3d", 1, 2, 3),
+    word(0x00000402), word(0x00000001), string("factors"),  # Symbol 11
+    word(0x00000013), word(0),
+    word(0x00000402), word(0x00000001), string("class"),  # Symbol 12
+    word(0x00000210), word(1), string("dgCMatrix"),
+    word(0x00000402), word(0x00000001), string("package"),  # Symbol 13
+    word(0x00000010), word(1), string("Matrix"),
+    word(0x000000fe),
+    word(0x000000fe),  # End of the slots
+    # Names of the list, tagged with a reference to symbol 1
+    word(0x00000402), word(0x000001ff),
+    word(0x00000010), word(5),
+    string("2013"), string("n"), string("m"), string("w"), string("Z"),
+    word(0x000000fe),
+])
+
+# %%
+with tempfile.TemporaryDirectory() as directory:
+    file_path = Path(directory) / "known.rds"
+    with gzip.open(file_path, "wb") as file:
+        file.write(rds)
+    rds_file = fabio_functions.read_rds(file_path)
+
+assert list(rds_file) == ["2013", "n", "m", "w", "Z"]
+assert rds_file["2013"][0] == 1.5 and np.isnan(rds_file["2013"][1])
+assert rds_file["n"].dtype == np.int32
+assert (rds_file["n"] == [1, 2, 3]).all()
+assert (rds_file["m"] == [[1.5, 3.5], [2.5, 4.5]]).all()
+assert isinstance(rds_file["w"], np.ndarray)
+assert (rds_file["w"] == [0.5, 2.5]).all()
+Z = fabio_functions._dgCMatrix_to_csc(rds_file["Z"])
+assert (Z.toarray() == [[1, 0, 2], [0, 0, 3]]).all()
+print("read_rds: known file read correctly")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import tempfile
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from pathlib import Path
+import fabio_functions
+import functions
+
+# Check RegionFootprint, grouped_footprints() and domestic_split() against
+# the dense footprints L.mul(y, axis=1), with L stored in column blocks and
+# with L given by a factorisation of I - A.
+n = 60
+tolerance = 1e-10
+by = ["item", "comm_group", "group"]
+rng = np.random.default_rng(0)
+index = pd.MultiIndex.from_arrays(
+    [
+        np.repeat([1, 2, 3], n // 3),
+        np.repeat(["AAA", "BBB", "CCC"], n // 3),
+        np.tile([f"item {i % 5}" for i in range(n // 3)], 3),
+        np.tile([f"comm_group {i % 3}" for i in range(n // 3)], 3),
+        np.tile([f"group {i % 2}" for i in range(n // 3)], 3),
+    ],
+    names=["area_code", "area", "item", "comm_group", "group"]
+)
+A = scipy.sparse.random(n, n, density=0.1, random_state=1, format="csc")
+A = A @ scipy.sparse.diags(0.5 / np.maximum(A.sum(axis=0).A1, 1))
+Y = pd.DataFrame(
+    rng.random((n, 3)) - 0.2,
+    index=index,
+    columns=pd.Index(["AAA", "BBB", "CCC"], name="iso3c")
+)
+# Products without demand in one region, and in all regions
+Y.iloc[5:10, 0] = 0
+Y.iloc[20:25] = 0
+solver = functions.LeontiefSolver(A, index=index)
+L_reference = solver.inverse()
+
+
+def difference(result, reference):
+    return np.abs(np.asarray(result) - np.asarray(reference)).max()
+
+
+# %%
+with tempfile.TemporaryDirectory() as directory:
+    fabio_functions.save_column_blocks(L_reference, Path(directory) / "L")
+    L_stored = fabio_functions.ColumnBlocks(Path(directory) / "L")
+
+    for name, L in [("stored L", L_stored), ("factorised L", solver)]:
+        # Labels are taken from the stored L or from Y
+        grouped = fabio_functions.grouped_footprints(L, Y, by, block_size=7)
+        for region in Y.columns:
+            reference = L_reference.mul(Y[region], axis=1)
+            footprint = fabio_functions.RegionFootprint(
+                L, Y[region], block_size=7
+            )
+            assert footprint.index.equals(index)
+            assert difference(footprint.to_frame(), reference) < tolerance
+            rows, columns = np.arange(0, n, 2), np.arange(n - 1, 0, -3)
+            assert difference(
+                footprint.select(rows, columns),
+                reference.iloc[rows, columns]
+            ) < tolerance
+            for axis in [0, 1]:
+                assert difference(
+                    footprint.sum(axis=axis), reference.sum(axis=axis)
+                ) < tolerance
+            reference_rows = reference.groupby(level=by).sum()
+            assert difference(
+                footprint.groupby(by, axis=0), reference_rows
+            ) < tolerance
+            reference_columns = reference.T.groupby(level=by).sum().T
+            for result in [footprint.groupby(by, axis=1), grouped[region]]:
+                assert result.index.equals(index)
+                assert result.columns.equals(reference_columns.columns)
+                assert difference(result, reference_columns) < tolerance
+
+            # Production in the region itself and elsewhere
+            domestic = reference_columns.index.isin([region], level="area")
+            reference_split = pd.concat(
+                [
+                    reference_columns[domestic].groupby(level=by).sum(),
+                    reference_columns[~domestic].groupby(level=by).sum()
+                ],
+                keys=["Domestic", "Non-domestic"],
+                names=["area"]
+            )
+            for result in [
+                footprint.domestic_split(region, by=by),
+                fabio_functions.domestic_split(grouped[region], region, by=by)
+            ]:
+                assert result.index.equals(reference_split.index)
+                assert difference(result, reference_split) < tolerance
+        print(f"{name}: region footprints match")
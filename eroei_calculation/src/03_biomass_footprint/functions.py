@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import inspect
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import scipy.sparse.linalg
+
+# Name of the relative tolerance argument of scipy's iterative solvers
+# ("tol" before scipy 1.12)
+_RTOL = (
+    "rtol"
+    if "rtol" in inspect.signature(scipy.sparse.linalg.gmres).parameters
+    else "tol"
+)
+
+
+# %%
+class LeontiefSolver:
+    """
+    Solves the Leontief system (I - A) X = B of one year.
+
+    With method "splu", I - A is factorised once with a sparse LU
+    decomposition and every solve is two sparse triangular solves. With
+    method "dense", the full inverse is computed with np.linalg.inv as
+    before, which is mainly kept for comparison.
+
+    With method "gmres" or "bicgstab", the system is not factorised when
+    the solver of an earlier year is given. A few right-hand sides, e.g.
+    Y_iso3c, are then solved iteratively, preconditioned with the
+    factorisation of the earlier year and started from its solution. As A
+    changes little from year to year, this takes few iterations. The
+    relative residual of every solution returned by an iterative solve is
+    kept in `residuals`. When an iterative solve does not converge, the
+    year is factorised instead, that solve and the remaining ones use the
+    factorisation, and `fallback` is set.
+    For many right-hand sides, such as the columns of L, factorising is
+    faster: columns(), inverse() and solve(B, iterative=False) factorise
+    the year first.
+
+    Methods
+    -------
+    solve(B, iterative=True)
+        Solution X of (I - A) X = B.
+    columns(positions)
+        Columns of the Leontief inverse L at the given positions.
+    inverse()
+        The full Leontief inverse L.
+    """
+
+    def __init__(self, A, method="splu", block_size=2048, previous=None,
+                 tolerance=1e-8, index=None):
+        """
+        Parameters
+        ----------
+        A : pd.DataFrame, np.ndarray OR SCIPY SPARSE MATRIX
+            Technical coefficients, with any diagonal repair already done.
+        method : STR, optional
+            "splu" for a sparse LU factorisation, "dense" for the dense
+            inverse, "gmres" or "bicgstab" for iterative solves. The
+            default is "splu".
+        block_size : INT, optional
+            Number of right-hand sides solved at once when building
+            columns of L. The default is 2048.
+        previous : LeontiefSolver, optional
+            Solver of the previous year, for the iterative methods.
+            Without it, the system is factorised.
+        tolerance : FLOAT, optional
+            Relative residual at which the iterative methods stop. The
+            default is 1e-8.
+        index : pd.Index, optional
+            Labels of A, e.g. for a scipy sparse A. Taken from A when it is
+            a pd.DataFrame.
+
+        Returns
+        -------
+        None.
+        """
+        if method not in ["splu", "dense", "gmres", "bicgstab"]:
+            raise ValueError(f"Unknown Leontief method: {method}")
+        self.method = method
+        self.block_size = block_size
+        self.tolerance = tolerance
+        self.residuals = []
+        self.fallback = False
+        self._iterative = False
+        self.index = index
+        if isinstance(A, pd.DataFrame):
+            if self.index is None:
+                self.index = A.index
+            A = A.values
+        elif hasattr(A, "matrix"):
+            A = A.matrix
+        self.n = A.shape[0]
+
+        if method == "dense":
+            if scipy.sparse.issparse(A):
+                A = A.toarray()
+            self._inverse = np.linalg.inv(np.eye(self.n) - A)
+        else:
+            self._I_A = (
+                scipy.sparse.identity(self.n, format="csc")
+                - scipy.sparse.csc_matrix(A)
+            )
+            if (
+                method != "splu"
+                and getattr(previous, "_lu", None) is not None
+            ):
+                # The latest factorisation, of the previous or an earlier
+                # year, is the preconditioner
+                self._lu = previous._lu
+                self._iterative = True
+            else:
+                self._factorise()
+
+    def _factorise(self):
+        self._lu = scipy.sparse.linalg.splu(self._I_A)
+        self._iterative = False
+
+    def _solve(self, values, iterative=True):
+        """Solve for one (1-D) or several (2-D) right-hand sides."""
+        if self.method == "dense":
+            return self._inverse @ values
+        if self._iterative and not iterative:
+            self._factorise()
+        if not self._iterative:
+            return self._lu.solve(values)
+        if values.ndim == 1:
+            return self._solve_iterative(values)
+        X = np.empty(values.shape, order="F")
+        for column in range(values.shape[1]):
+            if not self._iterative:
+                # Factorised after an iterative solve did not converge
+                X[:, column:] = self._lu.solve(values[:, column:])
+                break
+            X[:, column] = self._solve_iterative(values[:, column])
+        return X
+
+    def _solve_iterative(self, b):
+        b_norm = np.linalg.norm(b)
+        if b_norm == 0:
+            return np.zeros(self.n)
+        preconditioner = scipy.sparse.linalg.LinearOperator(
+            (self.n, self.n), matvec=self._lu.solve
+        )
+        iterate = {
+            "gmres": scipy.sparse.linalg.gmres,
+            "bicgstab": scipy.sparse.linalg.bicgstab,
+        }[self.method]
+        x, info = iterate(
+            self._I_A,
+            b,
+            # The earlier year's solution of the same right-hand side
+            x0=self._lu.solve(b),
+            M=preconditioner,
+            atol=0,
+            **{_RTOL: self.tolerance}
+        )
+        if info != 0:
+            # Not converged: factorise this year instead
+            self._factorise()
+            self.fallback = True
+            x = self._lu.solve(b)
+        # Residual of the solution returned
+        self.residuals.append(np.linalg.norm(b - self._I_A @ x) / b_norm)
+        return x
+
+    def solve(self, B, iterative=True):
+        """
+        Solution X of (I - A) X = B.
+
+        Parameters
+        ----------
+        B : np.ndarray, pd.Series OR pd.DataFrame
+            Right-hand side(s), e.g. final demand. Labels are kept.
+        iterative : BOOL, optional
+            Solve iteratively when the solver was set up for it. False
+            factorises the year first, which is faster for many right-hand
+            sides. The default is True.
+
+        Returns
+        -------
+        X : SAME TYPE AS B
+        """
+        X = self._solve(np.asarray(B, dtype=np.float64), iterative)
+
+        if isinstance(B, pd.DataFrame):
+            return pd.DataFrame(X, index=B.index, columns=B.columns)
+        if isinstance(B, pd.Series):
+            return pd.Series(X, index=B.index, name=B.name)
+        return X
+
+    def columns(self, positions):
+        """
+        Columns of the Leontief inverse L at the given positions.
+
+        Parameters
+        ----------
+        positions : ARRAY OF INT
+            Column positions in L.
+
+        Returns
+        -------
+        L_columns : np.ndarray
+            Array of shape (n, len(positions)), in Fortran order.
+        """
+        positions = np.asarray(positions)
+        if self.method == "dense":
+            return np.asfortranarray(self._inverse[:, positions])
+
+        L_columns = np.empty((self.n, len(positions)), order="F")
+        for start in range(0, len(positions), self.block_size):
+            block = positions[start:start + self.block_size]
+            unit = np.zeros((self.n, len(block)), order="F")
+            unit[block, np.arange(len(block))] = 1
+            L_columns[:, start:start + len(block)] = self._solve(
+                unit, iterative=False
+            )
+        return L_columns
+
+    def inverse(self):
+        """
+        The full Leontief inverse L.
+
+        Returns
+        -------
+        L : pd.DataFrame OR np.ndarray
+            Labelled with the index of A when A had one.
+        """
+        if self.method == "dense":
+            L = self._inverse
+        else:
+            L = self.columns(np.arange(self.n))
+        if self.index is None:
+            return L
+        return pd.DataFrame(L, index=self.index, columns=self.index)
+
+
+def tiered_footprint(A, Y, max_tier=10, tolerance=1e-6):
+    """
+    Production for final demand as the power series
+    L Y = Y + A Y + A² Y + ..., split by production tier.
+
+    Tier 0 is the final demand itself (direct production), tier 1 the
+    inputs to it (1st-order upstream), tier 2 the inputs to those, and so
+    on. Each tier is one sparse matrix product with the previous tier, so
+    no factorisation or inverse is needed. The sum of the tiers approaches
+    L Y from below for a non-negative A; the series converges slowly for
+    products with diagonal coefficients close to one.
+
+    Parameters
+    ----------
+    A : SCIPY SPARSE MATRIX OR np.ndarray
+        Technical coefficients.
+    Y : pd.DataFrame OR pd.Series
+        Final demand, e.g. Y_iso3c.
+    max_tier : INT, optional
+        Last tier calculated. The default is 10.
+    tolerance : FLOAT, optional
+        Stop earlier when a tier adds less than this share to the sum of
+        the tiers (largest absolute value). The default is 1e-6.
+
+    Returns
+    -------
+    tiers : pd.DataFrame OR pd.Series
+        Contribution of each tier, with a "tier" level before the index of
+        Y.
+    change : FLOAT
+        Relative contribution of the last tier, an indication of the
+        truncation error.
+    """
+    tier = np.asarray(Y, dtype=np.float64)
+    tiers = [tier]
+    total = tier.copy()
+    change = np.inf
+    for _ in range(max_tier):
+        tier = A @ tier
+        tiers.append(tier)
+        total += tier
+        scale = np.abs(total).max()
+        change = np.abs(tier).max() / scale if scale else 0
+        if change < tolerance:
+            break
+
+    if isinstance(Y, pd.DataFrame):
+        frames = [
+            pd.DataFrame(tier, index=Y.index, columns=Y.columns)
+            for tier in tiers
+        ]
+    else:
+        frames = [pd.Series(tier, index=Y.index, name=Y.name) for tier in tiers]
+    return pd.concat(frames, keys=range(len(frames)), names=["tier"]), change
+
+
+def repair_diagonal(A, minimum=1, value=1-1e-10):
+    """
+    Set diagonal coefficients of at least `minimum` to `value`, in place.
+
+    A diagonal coefficient of 1 or more means that a product needs at least
+    one unit of itself per unit of output, which makes I - A singular or
+    its inverse negative.
+
+    Parameters
+    ----------
+    A : SCIPY SPARSE CSC MATRIX OR np.ndarray
+        Technical coefficients. Sparse matrices are changed in their data
+        array, without changing their structure.
+    minimum : FLOAT, optional
+        Smallest diagonal coefficient that is repaired. The default is 1.
+    value : FLOAT, optional
+        New value of the repaired coefficients. The default is 1-1e-10.
+
+    Returns
+    -------
+    issues : np.ndarray
+        Positions of the repaired coefficients.
+    values : np.ndarray
+        Their values before the repair.
+    """
+    diagonal = A.diagonal()
+    issues = np.flatnonzero(diagonal >= minimum)
+    if scipy.sparse.issparse(A):
+        # Column of every stored entry, to find the diagonal in A.data
+        columns = np.repeat(np.arange(A.shape[1]), np.diff(A.indptr))
+        on_diagonal = (A.indices == columns) & (A.data >= minimum)
+        A.data[on_diagonal] = value
+    else:
+        A[issues, issues] = value
+    return issues, diagonal[issues]
+
+
+def group_codes(index, levels):
+    """
+    Integer group of every entry of a pd.MultiIndex.
+
+    Parameters
+    ----------
+    index : pd.MultiIndex
+        E.g. the io_codes index of A.
+    levels : list
+        Levels that define a group, e.g. ["item", "comm_group", "group"].
+
+    Returns
+    -------
+    codes : np.ndarray
+        Group position of each entry.
+    groups : pd.MultiIndex
+        Group labels, sorted as in pd.DataFrame.groupby.
+    """
+    codes, groups = (
+        index
+        .droplevel([name for name in index.names if name not in levels])
+        .reorder_levels(levels)
+        .factorize(sort=True)
+    )
+    return codes, pd.MultiIndex.from_tuples(groups, names=levels)
+
+
+def aggregated_footprint(L, y, codes, n_groups):
+    """
+    Footprint of one final demand vector with the demanded products
+    aggregated into groups, L @ (diag(y) · G).
+
+    G is the 0/1 matrix that maps each product to its group, so the result
+    equals L.mul(y, axis=1) summed over the columns of each group, without
+    ever forming the n x n footprint.
+
+    Parameters
+    ----------
+    L : LeontiefSolver, pd.DataFrame OR np.ndarray
+        Solver of the year, or L itself when it was modified after solving
+        (e.g. with negative values set to zero).
+    y : np.ndarray OR pd.Series
+        Final demand of one region.
+    codes : np.ndarray
+        Group position of each product, see group_codes().
+    n_groups : INT
+        Number of groups.
+
+    Returns
+    -------
+    footprint : np.ndarray
+        Array of shape (n, n_groups).
+    """
+    demand = np.zeros((len(codes), n_groups), order="F")
+    demand[np.arange(len(codes)), codes] = np.asarray(y)
+    if isinstance(L, LeontiefSolver):
+        return L.solve(demand, iterative=False)
+    return np.asarray(L) @ demand
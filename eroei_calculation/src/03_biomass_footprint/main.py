@@ -23,16 +23,67 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 # %%
 import os
+import time
+import logging
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from tqdm import tqdm
 import fabio_functions
+import functions
+import scheduler
 
 years = np.arange(1995, 2021)
 
 data_path = Path("../../data")
-exclude_negatives = False
+# Variants calculated in one run: with final demand as given, and with
+# negative final demand set to zero
+variants = ["incl_negatives", "excl_negatives"]
+# "splu" factorises I - A with a sparse LU, "dense" uses np.linalg.inv.
+# "gmres" and "bicgstab" solve L Y_iso3c iteratively from the previous
+# year's solution, preconditioned with its factorisation (sequential runs
+# only). This only skips the factorisation with footprint_mode =
+# "production"; the footprints need the factorisation of every year.
+leontief_method = "splu"
+# Relative residual at which the iterative methods stop
+solver_tolerance = 1e-8
+# "aggregated" writes footprints summed over the input regions, as read by
+# 04_calculate_results. "full" writes the whole L.mul(y) of every region.
+# "production" only writes the production for Y_iso3c, L Y_iso3c. "tiers"
+# is a quick look without solving: the same production as the power series
+# Y + A Y + A² Y + ..., by production tier.
+footprint_mode = "aggregated"
+# Last tier, and relative contribution at which the series stops ("tiers")
+series_max_tier = 10
+series_tolerance = 1e-6
+# Save L in column blocks (fabio_functions.save_column_blocks()), e.g. for
+# footprint_mode = "lazy" in 04_calculate_results. L is otherwise only built
+# for footprint_mode = "full": the aggregated footprints are solved directly
+# with the factorisation of I - A.
+save_L = False
+# Y_iso3c, the production and the tiers are saved as binary files, see
+# fabio_functions.save_matrix(). Without compression (None), Y_iso3c is
+# loaded without copying; "zstd" gives smaller files that are decompressed
+# when loaded.
+matrix_compression = None
+# Also save L and Y_iso3c as TSV, for use outside of Python
+export_tsv = False
+# Region footprints as "feather" (wide, ";"-joined headers) or "parquet"
+# (long format without entries of at most footprint_epsilon)
+footprint_format = "feather"
+footprint_epsilon = 0
+
+# Years loaded ahead in the background, and memory they may hold (bytes)
+prefetch_depth = 1
+prefetch_max_memory = 8e9
+
+# Years calculated in parallel (1: sequential with prefetching, -1: as many
+# as the memory allows). Can be set with --jobs on the command line.
+n_jobs = 1
+# n x n arrays held at once per year: L, one region footprint and the
+# inversion workspace (A is sparse), when L is built
+memory_intermediates = 3
 final_demand_categories = [
     "balancing",
     "food",
@@ -43,6 +94,28 @@ final_demand_categories = [
     "unspecified"
 ]
 
+# parse_known_args, so that the cells also run in interactive sessions
+parser = argparse.ArgumentParser(description="FABIO biomass footprints.")
+parser.add_argument(
+    "--jobs", type=int, default=n_jobs,
+    help="Years calculated in parallel (-1: as many as memory allows)."
+)
+n_jobs = parser.parse_known_args()[0].jobs
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s"
+)
+logger = logging.getLogger("03_biomass_footprint")
+
+# Aggregated footprints are kept apart from the full ones
+footprint_suffix = {
+    "aggregated": "_aggregated",
+    "full": "",
+    "production": "_production",
+    "tiers": "_tiers"
+}[footprint_mode]
+
 # %%
 fabio_path = (
     data_path
@@ -72,107 +145,304 @@ def save_region_footprint(df, save_path, iso_code):
             "group_input"
             ], axis=1
         )
-        .reset_index()
     )
-    df.columns = df.columns.map(";".join)
-    df.to_feather(save_path / f"{iso_code}")
+    save_footprint(df, save_path, iso_code)
 
 
-# %%
-A_issues_list = []
-for year_save in years:
-    reader = fabio_functions.read(
-        path=fabio_path,
-        year=year_save,
-        version=1.2
+def save_aggregated_footprint(footprint, index, groups, save_path, iso_code):
+    df = (
+        pd.DataFrame(footprint, index=index, columns=groups)
+        .droplevel(["area_code", "item_code", "comm_code"], axis=0)
+        .rename_axis([
+            "area_output",
+            "item_output",
+            "comm_group_output",
+            "group_output"
+            ], axis=0
+        )
+        .rename_axis([
+            "item_input",
+            "comm_group_input",
+            "group_input"
+            ], axis=1
+        )
     )
+    save_footprint(df, save_path, iso_code)
 
-    Z = reader.Z(version="mass")
-    Y = reader.Y()
 
-    Y_iso3c = (
-        Y
-        .loc[
-            :,
-            Y.columns.isin(final_demand_categories, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
-    )
-    if exclude_negatives:
-        Y_iso3c[Y_iso3c < 0] = 0
-
-    x = Y_iso3c.sum(axis=1) + Z.sum(axis=1)
-    A = Z.div(x, axis=1).replace([np.nan, np.inf, -np.inf], 0)
-    A_issue = A.loc[np.diag(A >= 1), np.diag(A >= 1)]
-    A_issues = (
-        pd.concat(
-            [
-                pd.Series(
-                    np.diag(A_issue),
-                    index=A_issue.index
-                ).to_frame("A_diagonal_value")
-            ], keys=[year_save], names=["year"])
-    )
-    A_issues_list.append(A_issues)
-    A_modified = A.copy()
-    for issue in A_issue.index:
-        A_modified.loc[issue, issue] = 1-1e-10
-    I = pd.DataFrame(
-        np.diag(np.ones(len(A))),
-        index=A.index,
-        columns=A.columns
-    )
-    L = pd.DataFrame(
-        np.linalg.inv((I-A_modified)),
-        index=A_modified.index,
-        columns=A_modified.index
+def save_footprint(df, save_path, iso_code):
+    if footprint_format == "parquet":
+        fabio_functions.save_footprint_long(
+            df,
+            save_path / f"{iso_code}.parquet",
+            epsilon=footprint_epsilon
+        )
+    else:
+        df = df.reset_index()
+        df.columns = df.columns.map(";".join)
+        df.to_feather(save_path / f"{iso_code}")
+
+
+# %%
+reader = fabio_functions.read(
+    path=fabio_path,
+    year=years[0],
+    version=1.2
+)
+
+
+def load_year(year):
+    reader.year = year
+    Z = reader.Z(version="mass", sparse=True)
+    Y_iso3c = reader.Y(
+        final_demand=final_demand_categories,
+        aggregate=["iso3c"]
     )
+    return Z, Y_iso3c
 
-    if exclude_negatives:
-        L[L < 0] = 0
 
-    # Saving L and Y for future use
-    if exclude_negatives:
-        L.to_csv(
-            fabio_path / f"L_{year_save}_mass_excl_negatives.tsv",
-            sep="\t"
-        )
-        Y_iso3c.to_csv(
-            fabio_path / f"Y_iso3c_{year_save}_excl_negatives.tsv",
-            sep="\t"
-        )
-    else:
-        L.to_csv(
-            fabio_path / f"L_{year_save}_mass_incl_negatives.tsv",
-            sep="\t"
-        )
-        Y_iso3c.to_csv(
-            fabio_path / f"Y_iso3c_{year_save}_incl_negatives.tsv",
-            sep="\t"
+# Solver of the previous year by variant, for the iterative methods
+previous_solvers = {}
+
+
+def calculate_year(year_save, Z, Y_iso3c_all):
+    # Shared by the variants
+    Z_sum = Z.sum(axis=1)
+    if footprint_mode == "aggregated":
+        input_codes, input_groups = functions.group_codes(
+            Y_iso3c_all.index, ["item", "comm_group", "group"]
         )
 
-    iso_codes = Y.columns.get_level_values("iso3c").unique()
-    for index_region, iso_code in tqdm(enumerate(iso_codes), desc=f"{year_save}:"):
-        Y_iso = Y_iso3c.loc[
-            :,
-            iso_code
-        ]
-        x_footprint_region = L.mul(Y_iso, axis=1)
+    A_issues_list = []
+    for variant in variants:
+        exclude_negatives = variant == "excl_negatives"
+        Y_iso3c = Y_iso3c_all
         if exclude_negatives:
+            Y_iso3c = Y_iso3c.clip(lower=0)
+
+        x = Y_iso3c.sum(axis=1) + Z_sum
+        A = Z.div(x, axis=1).matrix.tocsc()
+        # Diagonal coefficients of 1 or more are set to 1-1e-10
+        issues, diagonal_values = functions.repair_diagonal(A)
+        A_issues = (
+            pd.concat(
+                [
+                    pd.Series(
+                        diagonal_values,
+                        index=Y_iso3c.index[issues]
+                    ).to_frame("A_diagonal_value")
+                ], keys=[(year_save, variant)], names=["year", "variant"])
+        )
+        if footprint_mode == "tiers":
+            tiers, change = functions.tiered_footprint(
+                A,
+                Y_iso3c,
+                max_tier=series_max_tier,
+                tolerance=series_tolerance
+            )
+            logger.info(
+                "%s %s: %s tiers, last tier adds %.1e",
+                year_save,
+                variant,
+                tiers.index.get_level_values("tier").max() + 1,
+                change
+            )
             save_path = (
                 data_path
                 / "interim"
-                / "biomass_footprint"
-                / "excl_negatives"
-                / str(year_save)
+                / f"biomass_footprint{footprint_suffix}"
+                / variant
+            )
+            os.makedirs(save_path, exist_ok=True)
+            fabio_functions.save_matrix(
+                tiers,
+                save_path / f"{year_save}.arrow",
+                compression=matrix_compression
+            )
+            A_issues_list.append(A_issues)
+            continue
+
+        solver = functions.LeontiefSolver(
+            A,
+            method=leontief_method,
+            previous=previous_solvers.get(variant),
+            tolerance=solver_tolerance,
+            index=Y_iso3c.index
+        )
+        # L is only built when it is saved or needed as a whole. Excluding
+        # negatives sets negative values of L to zero, which only needs L
+        # when A has negative coefficients: otherwise L = I + A + A² + ...
+        # has none.
+        L = None
+        if (
+            save_L
+            or footprint_mode == "full"
+            or (exclude_negatives and A.data.min(initial=0) < 0)
+        ):
+            L = solver.inverse()
+            if exclude_negatives:
+                L[L < 0] = 0
+
+        # Saving L and Y for future use
+        if save_L:
+            # Column-block layout for memory-mapped access to single regions
+            fabio_functions.save_column_blocks(
+                L, fabio_path / f"L_{year_save}_mass_{variant}"
+            )
+        fabio_functions.save_matrix(
+            Y_iso3c,
+            fabio_path / f"Y_iso3c_{year_save}_{variant}.arrow",
+            compression=matrix_compression
+        )
+        if export_tsv:
+            if save_L:
+                L.to_csv(
+                    fabio_path / f"L_{year_save}_mass_{variant}.tsv",
+                    sep="\t"
+                )
+            Y_iso3c.to_csv(
+                fabio_path / f"Y_iso3c_{year_save}_{variant}.tsv",
+                sep="\t"
+            )
+
+        if footprint_mode == "production":
+            # L Y_iso3c, the production for the final demand of each
+            # country. These few right-hand sides are what the iterative
+            # methods solve without factorising the year.
+            production = (
+                solver.solve(Y_iso3c) if L is None else L.dot(Y_iso3c)
             )
-        else:
             save_path = (
                 data_path
                 / "interim"
-                / "biomass_footprint"
-                / "incl_negatives"
-                / str(year_save)
+                / f"biomass_footprint{footprint_suffix}"
+                / variant
             )
-        os.makedirs(save_path, exist_ok=True)
-        save_region_footprint(x_footprint_region, save_path, iso_code)
+            os.makedirs(save_path, exist_ok=True)
+            fabio_functions.save_matrix(
+                production,
+                save_path / f"{year_save}.arrow",
+                compression=matrix_compression
+            )
+        else:
+            iso_codes = Y_iso3c.columns
+            for index_region, iso_code in tqdm(
+                enumerate(iso_codes), desc=f"{year_save} {variant}:"
+            ):
+                Y_iso = Y_iso3c.loc[
+                    :,
+                    iso_code
+                ]
+                save_path = (
+                    data_path
+                    / "interim"
+                    / f"biomass_footprint{footprint_suffix}"
+                    / variant
+                    / str(year_save)
+                )
+                os.makedirs(save_path, exist_ok=True)
+                if footprint_mode == "aggregated":
+                    # L @ (diag(y) · G), the footprint summed over input regions,
+                    # from L when it was built (and possibly clipped) and solved
+                    # with the factorisation otherwise
+                    x_footprint_region = functions.aggregated_footprint(
+                        solver if L is None else L,
+                        Y_iso,
+                        input_codes,
+                        len(input_groups)
+                    )
+                    save_aggregated_footprint(
+                        x_footprint_region,
+                        Y_iso3c.index,
+                        input_groups,
+                        save_path,
+                        iso_code
+                    )
+                else:
+                    x_footprint_region = L.mul(Y_iso, axis=1)
+                    save_region_footprint(x_footprint_region, save_path, iso_code)
+
+        if solver.residuals:
+            logger.info(
+                "%s %s: %s iterative solves, relative residual up to %.1e",
+                year_save,
+                variant,
+                len(solver.residuals),
+                max(solver.residuals)
+            )
+        if solver.fallback:
+            logger.warning(
+                "%s %s: an iterative solve did not converge, the year was "
+                "factorised instead",
+                year_save,
+                variant
+            )
+        if leontief_method in ["gmres", "bicgstab"]:
+            previous_solvers[variant] = solver
+
+        A_issues_list.append(A_issues)
+        # Free the matrices of this variant before the next one is built
+        del A, solver, L
+
+    return pd.concat(A_issues_list)
+
+
+def run_year(year):
+    return calculate_year(year, *load_year(year))
+
+
+# %%
+if __name__ == "__main__":
+    start = time.perf_counter()
+    A_issues_list = []
+    if n_jobs == 1:
+        summary = []
+        for year_save, (Z, Y_iso3c) in fabio_functions.Prefetcher(
+            load_year,
+            years,
+            depth=prefetch_depth,
+            max_memory=prefetch_max_memory
+        ):
+            # Peak memory of this year only (plus the prefetched years)
+            scheduler.reset_peak_memory()
+            year_start = time.perf_counter()
+            A_issues_list.append(calculate_year(year_save, Z, Y_iso3c))
+            summary.append({
+                "year": year_save,
+                "seconds": time.perf_counter() - year_start,
+                "peak_memory_GB": scheduler.peak_memory() / 1e9,
+                "pid": os.getpid(),
+            })
+            logger.info(
+                "%s: %.0f s, peak memory %.1f GB",
+                year_save,
+                summary[-1]["seconds"],
+                summary[-1]["peak_memory_GB"]
+            )
+        summary = pd.DataFrame(summary).set_index("year")
+    else:
+        A_issues_list, summary = scheduler.run_years(
+            run_year,
+            years,
+            n_jobs=n_jobs,
+            year_memory=scheduler.year_memory(
+                len(reader.io_codes), memory_intermediates
+            ),
+            logger=logger
+        )
+
+    # Wall time and peak memory of each year
+    summary_path = data_path / "interim" / "biomass_footprint_run_summary.tsv"
+    os.makedirs(summary_path.parent, exist_ok=True)
+    summary.to_csv(summary_path, sep="\t")
+
+    # Diagonal coefficients of A that were repaired, in all years
+    A_issues_path = data_path / "interim" / "biomass_footprint_A_issues.tsv"
+    os.makedirs(A_issues_path.parent, exist_ok=True)
+    pd.concat(A_issues_list).to_csv(A_issues_path, sep="\t")
+    logger.info(
+        "%s repaired diagonal coefficients, see %s",
+        sum(len(A_issues) for A_issues in A_issues_list),
+        A_issues_path
+    )
+    logger.info("Total wall time: %.0f s", time.perf_counter() - start)
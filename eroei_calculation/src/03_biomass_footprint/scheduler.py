@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# %%
+# %% [markdown]
+# Copyright (C) 2024 Kajwan Rasul
+# 
+#
+# Written by
+#
+# - Kajwan Rasul
+#
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# %%
+import os
+import time
+import resource
+import pandas as pd
+from joblib import Parallel, delayed, parallel_backend
+
+
+# %%
+def peak_memory():
+    """
+    Peak resident memory of this process in bytes, since the process
+    started or since the last reset_peak_memory().
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux, and cannot be reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_memory():
+    """Reset the peak resident memory of this process, where supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def available_memory():
+    """Memory available for new processes in bytes."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def year_memory(n, intermediates):
+    """Estimated peak memory in bytes of one year with n x n float arrays."""
+    return n**2 * 8 * intermediates
+
+
+def _run_timed(function, year):
+    reset_peak_memory()
+    start = time.perf_counter()
+    result = function(year)
+    return result, time.perf_counter() - start, peak_memory(), os.getpid()
+
+
+def run_years(
+    function,
+    years,
+    n_jobs=-1,
+    year_memory=None,
+    memory_margin=1.2,
+    logger=None
+):
+    """
+    Run function(year) for all years in parallel worker processes.
+
+    The number of workers is capped so that the peak memory of the years
+    running at once fits in the available memory. Without an estimate, the
+    peak memory of a year is measured by running the first year on its own.
+    The peak memory is reset before each year, so that it is the year's own
+    peak even when a worker runs several years. The cores are shared
+    between the workers, by limiting the BLAS threads of each.
+
+    Parameters
+    ----------
+    function : CALLABLE
+        Calculation of one year.
+    years : ARRAY
+        Years to run.
+    n_jobs : INT, optional
+        Maximum number of workers, -1 for one per core. The default is -1.
+    year_memory : FLOAT, optional
+        Peak memory of one year in bytes, e.g. from year_memory(). The
+        default None measures it.
+    memory_margin : FLOAT, optional
+        Factor on the peak memory of one year when capping the workers.
+        The default is 1.2.
+    logger : logging.Logger, optional
+        Logger for the schedule and the time and peak memory of each year.
+
+    Returns
+    -------
+    results : list
+        Return values of function, in the order of years.
+    summary : pd.DataFrame
+        Wall time, peak resident memory and worker process of each year.
+    """
+    years = list(years)
+    timed_results = []
+    if year_memory is None and len(years) > 1 and n_jobs != 1:
+        timed_results.append(_run_timed(function, years[0]))
+        year_memory = timed_results[0][2]
+
+    remaining_years = years[len(timed_results):]
+    n_cpus = os.cpu_count()
+    n_workers = n_cpus if n_jobs == -1 else n_jobs
+    if year_memory:
+        n_workers = min(
+            n_workers,
+            int(available_memory() // (year_memory * memory_margin))
+        )
+    n_workers = max(1, min(n_workers, len(remaining_years)))
+    n_threads = max(1, n_cpus // n_workers)
+    if logger is not None:
+        logger.info(
+            "%s workers with %s BLAS threads each (%.1f GB per year, "
+            "%.1f GB available)",
+            n_workers,
+            n_threads,
+            (year_memory or 0) / 1e9,
+            available_memory() / 1e9
+        )
+
+    with parallel_backend("loky", inner_max_num_threads=n_threads):
+        timed_results += Parallel(n_jobs=n_workers)(
+            delayed(_run_timed)(function, year) for year in remaining_years
+        )
+
+    results = []
+    summary = []
+    for year, (result, seconds, memory, pid) in zip(years, timed_results):
+        if logger is not None:
+            logger.info(
+                "%s: %.0f s, peak memory %.1f GB", year, seconds, memory / 1e9
+            )
+        results.append(result)
+        summary.append({
+            "year": year,
+            "seconds": seconds,
+            "peak_memory_GB": memory / 1e9,
+            "pid": pid,
+        })
+    return results, pd.DataFrame(summary).set_index("year")
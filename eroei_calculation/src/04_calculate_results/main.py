@@ -35,9 +35,22 @@ import country_converter as coco
 cc = coco.CountryConverter(include_obsolete=True)
 years = np.arange(1995, 2021)
 
-exclude_negatives = True
+# Variants calculated in one run: with final demand as given, and with
+# negative final demand set to zero
+variants = ["incl_negatives", "excl_negatives"]
+# Footprints written by 03_biomass_footprint: "aggregated" (summed over the
+# input regions when written) or "full". "lazy" computes them from the L
+# and Y_iso3c stored by 03 with save_L = True instead, without per-region
+# footprint files.
+footprint_mode = "aggregated"
+# File format of the footprints written by 03: "feather" or "parquet"
+footprint_format = "feather"
 data_path = Path("../../data")
 
+# Years loaded ahead in the background, and memory they may hold (bytes)
+prefetch_depth = 1
+prefetch_max_memory = 16e9
+
 final_demand_categories = [
     "balancing",
     "food",
@@ -59,6 +72,10 @@ final_demand_categories_cal = [
 ]
 
 # %%
+footprint_suffix = {
+    "aggregated": "_aggregated", "full": "", "lazy": ""
+}[footprint_mode]
+
 auxiliary_path = (
     data_path
     / "auxiliary"
@@ -211,76 +228,104 @@ product_mapping = (
 )
 
 # %%
-for year in tqdm(years):
-    # Load data
-    # Global totals
-    reader = fabio_functions.read(
-        fabio_path,
-        year=year,
-        version=1.2
-    )
+# All FABIO data of a year (biomass Z and Y, calorie Y buckets) in one pass
+views = fabio_functions.FabioViews(
+    fabio_path,
+    fabio_calories_path,
+    final_demand_categories,
+    final_demand_categories_cal,
+    version=1.2
+)
 
-    Z = reader.Z(version="mass")
-
-    # TODO: read Y from file instead
-    Y = reader.Y()
-    Y = (
-        Y
-        .loc[
-            :,
-            Y.columns.isin(final_demand_categories, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
-    )
-    if exclude_negatives:
-        Y[Y < 0] = 0
 
-    x = Y.sum(axis=1) + Z.sum(axis=1)
-    biomass_production = (
-        x
-        .droplevel(["area_code", "item_code", "comm_code"])
-        .rename_axis([
-            "area_output",
-            "item_output",
-            "comm_group_output",
-            "group_output"
-        ])
-    )
-    
-    # Footprint data
-    if exclude_negatives:
-        biomass_footprint_path = (
-            data_path
-            / "interim"
-            / "biomass_footprint"
-            / "excl_negatives"
-            / str(year)
+def read_footprints(year, year_views, variant):
+    biomass_footprint_path = (
+        data_path
+        / "interim"
+        / f"biomass_footprint{footprint_suffix}"
+        / variant
+        / str(year)
+    )
+    if footprint_mode == "lazy":
+        L = views.reader.L_blocks(version=f"mass_{variant}")
+        # Y_iso3c as used by 03, i.e. clipped for excl_negatives
+        Y_iso3c = fabio_functions.load_matrix(
+            fabio_path / f"Y_iso3c_{year}_{variant}.arrow"
         )
-    else:
-        biomass_footprint_path = (
-            data_path
-            / "interim"
-            / "biomass_footprint"
-            / "incl_negatives"
-            / str(year)
+        # One pass over L for the footprints of all regions
+        lazy_footprints = fabio_functions.grouped_footprints(
+            L,
+            Y_iso3c.loc[:, regions.area_ISO3.values],
+            ["item", "comm_group", "group"]
         )
+
     biomass_footprints = []
     for index, region in enumerate(regions.area_ISO3.values):
-        biomass_footprints.append(
-            read_region_footprint(biomass_footprint_path, region)
-            .groupby(level=[1, 2, 3], axis=1).sum()
-        )
-
-    biomass_footprint = pd.concat(
-        biomass_footprints,
-        keys=regions.area_ISO3.values,
-        names=["area"],
-        axis=1
-    )
-    biomass_footprint = (
-        biomass_footprint
-        .rename(iso3_mapper, axis=1, level="area")
-    )
+        if footprint_mode == "lazy":
+            biomass_footprints.append(
+                lazy_footprints.pop(region)
+                .droplevel(["area_code", "item_code", "comm_code"])
+                .rename_axis([
+                    "area_output",
+                    "item_output",
+                    "comm_group_output",
+                    "group_output"
+                ])
+                .rename_axis([None, None, None], axis=1)
+            )
+            continue
+        if footprint_format == "parquet":
+            biomass_footprint = (
+                fabio_functions.read_footprint_long(
+                    biomass_footprint_path / f"{region}.parquet",
+                    wide=True
+                )
+            )
+            # Unnamed input levels, as in the feather files
+            biomass_footprint.columns.names = (
+                [None] * biomass_footprint.columns.nlevels
+            )
+        else:
+            biomass_footprint = read_region_footprint(
+                biomass_footprint_path, region
+            )
+        if footprint_mode == "full":
+            biomass_footprint = (
+                biomass_footprint
+                .groupby(level=[1, 2, 3], axis=1).sum()
+            )
+        biomass_footprints.append(biomass_footprint)
+
+    return biomass_footprints
+
+
+def load_year(year):
+    # Global totals and calorie data
+    year_views = views.get(year)
+
+    # Footprint data of each variant
+    biomass_footprints = {
+        variant: read_footprints(year, year_views, variant)
+        for variant in variants
+    }
+
+    return year_views, biomass_footprints
+
+
+# Year t+1 is loaded in the background while year t is calculated
+for year, (year_views, biomass_footprints) in tqdm(
+    fabio_functions.Prefetcher(
+        load_year,
+        years,
+        depth=prefetch_depth,
+        max_memory=prefetch_max_memory
+    ),
+    total=len(years)
+):
+    # Load data
+    # Global totals
+    Z = year_views["Z"]
+    Z_sum = Z.sum(axis=1)
 
     # Upstream energy
     upstream_energy_path = (
@@ -328,37 +373,23 @@ for year in tqdm(years):
     )
 
     # Calorie data
-    reader_cal = fabio_functions.read(
-        fabio_calories_path,
-        year=year,
-        version=1.2
-    )
-
-    Y_cal = reader_cal.Y()
-    y_regions_cal = (
-        Y_cal
-        .loc[
-            :,
-            Y_cal.columns.isin(final_demand_categories_cal, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
+    y_regions_cal_all = (
+        year_views["Y_cal"]
         .droplevel(["area_code", "item_code", "comm_code"])
     ) * 4.1858e-6  # TJ / Mcal
 
     y_regions_cal_other_losses = (
-        Y_cal
-        .loc[
-            :,
-            ~Y_cal.columns.isin(final_demand_categories_cal, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
+        year_views["Y_cal_other_losses"]
         .droplevel(["area_code", "item_code", "comm_code"])
     ) * 4.1858e-6  # TJ / Mcal
 
-    if exclude_negatives:
-        y_regions_cal[y_regions_cal < 0] = 0
-
     # Prepare data
+    production_levels = [
+        "area_output",
+        "item_output",
+        "comm_group_output",
+        "group_output"
+    ]
     # Fertiliser
     fertiliser_footprint = (
         fertiliser_energy_footprint
@@ -385,66 +416,10 @@ for year in tqdm(years):
     F_fertiliser_energy = fertiliser_footprint["fertiliser_energy_item"]
 
     F_fertiliser_input = (
-        F_fertiliser_input.unstack(biomass_production.index.names)
+        F_fertiliser_input.unstack(production_levels)
     )
     F_fertiliser_energy = (
-        F_fertiliser_energy.unstack(biomass_production.index.names)
-    )
-    S_fertiliser_input = (
-        F_fertiliser_input
-        .div(biomass_production, axis=1)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-
-    S_fertiliser_input_vector = (
-        F_fertiliser_input.sum(axis=0)
-        .div(biomass_production)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-
-    S_fertiliser_energy = (
-        F_fertiliser_energy
-        .div(biomass_production, axis=1)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-    S_fertiliser_energy_vector = (
-        F_fertiliser_energy.sum(axis=0)
-        .div(biomass_production)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-
-    # Allocate upstream energy using biomass production
-    biomass_production_mapped = (
-        biomass_production[
-            biomass_production
-            .index
-            .get_level_values("item_output")
-            .isin(product_mapping.item_output)
-        ]
-        .to_frame("biomass_output")
-        .reset_index()
-        .merge(
-            product_mapping,
-            on="item_output",
-            how="left"
-        )
-        .merge(
-            regions[["area", "region"]],
-            left_on="area_output",
-            right_on="area"
-        ).drop("area", axis=1)
-        .pivot(
-            columns=biomass_production.index.names,
-            index=["region", "sector"],
-            values="biomass_output"
-        )
-    )
-    biomass_production_mapped_shares = (
-        biomass_production_mapped
-        .div(
-            biomass_production_mapped.sum(axis=1),
-            axis=0
-        ).replace([np.nan, np.inf, -np.inf], 0)
+        F_fertiliser_energy.unstack(production_levels)
     )
 
     primary_upstream_energy_unallocated = (
@@ -470,214 +445,324 @@ for year in tqdm(years):
         )
     )
 
-    F_primary_upstream = (
-        primary_upstream_energy_unallocated
-        .dot(
-            biomass_production_mapped_shares
-            .loc[primary_upstream_energy_unallocated.columns, :]
+    # Results of each variant, from the shared data above
+    for variant in variants:
+        exclude_negatives = variant == "excl_negatives"
+
+        # TODO: read Y from file instead
+        Y = year_views["Y"]
+        if exclude_negatives:
+            Y = Y.clip(lower=0)
+
+        x = Y.sum(axis=1) + Z_sum
+        biomass_production = (
+            x
+            .droplevel(["area_code", "item_code", "comm_code"])
+            .rename_axis([
+                "area_output",
+                "item_output",
+                "comm_group_output",
+                "group_output"
+            ])
         )
-    )
 
-    F_processed_upstream = (
-        processed_upstream_energy_unallocated
-        .dot(
-            biomass_production_mapped_shares
-            .loc[processed_upstream_energy_unallocated.columns, :]
+        # Footprint data
+        biomass_footprint = pd.concat(
+            biomass_footprints[variant],
+            keys=regions.area_ISO3.values,
+            names=["area"],
+            axis=1
+        )
+        biomass_footprint = (
+            biomass_footprint
+            .rename(iso3_mapper, axis=1, level="area")
         )
-    )
 
-    S_primary_upstream = (
-        F_primary_upstream
-        .div(biomass_production, axis=1)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-    S_primary_upstream_vector = (
-        F_primary_upstream.sum(axis=0)
-        .div(biomass_production)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
+        # Calorie data
+        y_regions_cal = y_regions_cal_all
+        if exclude_negatives:
+            y_regions_cal = y_regions_cal.clip(lower=0)
 
-    S_processed_upstream = (
-        F_processed_upstream
-        .div(biomass_production, axis=1)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
-    S_processed_upstream_vector = (
-        F_processed_upstream.sum(axis=0)
-        .div(biomass_production)
-        .replace([np.nan, np.inf, -np.inf], 0)
-    )
+        S_fertiliser_input = (
+            F_fertiliser_input
+            .div(biomass_production, axis=1)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
 
-    # Calculate footprints
-    upstream_primary_footprint = S_primary_upstream.dot(biomass_footprint)
-    upstream_processed_footprint = S_processed_upstream.dot(biomass_footprint)
-    upstream_fertiliser_footprint = (
-        S_fertiliser_energy
-        .loc[:, biomass_footprint.index]
-        .dot(biomass_footprint)
-    )
-    fertiliser_input_footprint = (
-        S_fertiliser_input
-        .loc[:, biomass_footprint.index]
-        .dot(biomass_footprint)
-    )
+        S_fertiliser_input_vector = (
+            F_fertiliser_input.sum(axis=0)
+            .div(biomass_production)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
 
-    upstream_primary_footprint_source = (
-        biomass_footprint.mul(S_primary_upstream_vector, axis=0)
-    )
-    upstream_processed_footprint_source = (
-        biomass_footprint.mul(S_processed_upstream_vector, axis=0)
-    )
-    fertiliser_input_footprint_source = (
-        biomass_footprint.mul(
-            S_fertiliser_input_vector.loc[biomass_footprint.index],
-            axis=0
+        S_fertiliser_energy = (
+            F_fertiliser_energy
+            .div(biomass_production, axis=1)
+            .replace([np.nan, np.inf, -np.inf], 0)
         )
-    )
-    fertiliser_energy_footprint_source = (
-        biomass_footprint.mul(
-            S_fertiliser_energy_vector.loc[biomass_footprint.index],
-            axis=0
+        S_fertiliser_energy_vector = (
+            F_fertiliser_energy.sum(axis=0)
+            .div(biomass_production)
+            .replace([np.nan, np.inf, -np.inf], 0)
         )
-    )
 
-    energy_inputs = pd.concat([
-        upstream_primary_footprint,
-        upstream_processed_footprint,
-        upstream_fertiliser_footprint
-    ], axis=0, keys=["primary", "processed", "fertiliser"], names=["source"])
-
-    y_global = (
-        y_regions_cal
-        .groupby(["item", "comm_group", "group"])
-        .sum()
-        .rename_axis(["area"], axis=1)
-        .rename(iso3_mapper, axis=1)
-        .stack()
-        .reorder_levels(["area", "item", "comm_group", "group"])
-    )
+        # Allocate upstream energy using biomass production
+        biomass_production_mapped = (
+            biomass_production[
+                biomass_production
+                .index
+                .get_level_values("item_output")
+                .isin(product_mapping.item_output)
+            ]
+            .to_frame("biomass_output")
+            .reset_index()
+            .merge(
+                product_mapping,
+                on="item_output",
+                how="left"
+            )
+            .merge(
+                regions[["area", "region"]],
+                left_on="area_output",
+                right_on="area"
+            ).drop("area", axis=1)
+            .pivot(
+                columns=biomass_production.index.names,
+                index=["region", "sector"],
+                values="biomass_output"
+            )
+        )
+        biomass_production_mapped_shares = (
+            biomass_production_mapped
+            .div(
+                biomass_production_mapped.sum(axis=1),
+                axis=0
+            ).replace([np.nan, np.inf, -np.inf], 0)
+        )
 
-    y_global_other_losses = (
-        y_regions_cal_other_losses
-        .groupby(["item", "comm_group", "group"])
-        .sum()
-        .rename_axis(["area"], axis=1)
-        .rename(iso3_mapper, axis=1)
-        .stack()
-        .reorder_levels(["area", "item", "comm_group", "group"])
-    )
+        F_primary_upstream = (
+            primary_upstream_energy_unallocated
+            .dot(
+                biomass_production_mapped_shares
+                .loc[primary_upstream_energy_unallocated.columns, :]
+            )
+        )
 
-    energy_outputs = pd.concat(
-        [
-            y_global.to_frame("consumption").T,
-            y_global_other_losses.to_frame("other_losses").T
-        ],
-        axis=0,
-        keys=["consumption", "other_losses"],
-        names=["source"]
-    )
+        F_processed_upstream = (
+            processed_upstream_energy_unallocated
+            .dot(
+                biomass_production_mapped_shares
+                .loc[processed_upstream_energy_unallocated.columns, :]
+            )
+        )
 
-    biomass_production_result = pd.concat(
-        [
-            biomass_production
-            .rename_axis(energy_inputs.columns.names)
-            .to_frame("biomass_production")
-            .T
-        ], axis=0, keys=["biomass_production"], names=["source"]
-    )
+        S_primary_upstream = (
+            F_primary_upstream
+            .div(biomass_production, axis=1)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
+        S_primary_upstream_vector = (
+            F_primary_upstream.sum(axis=0)
+            .div(biomass_production)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
 
-    fertiliser_input_footprint_result = (
-        pd.concat(
-            [fertiliser_input_footprint],
-            keys=["fertiliser_input"],
-            names=["source"],
-            axis=0
+        S_processed_upstream = (
+            F_processed_upstream
+            .div(biomass_production, axis=1)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
+        S_processed_upstream_vector = (
+            F_processed_upstream.sum(axis=0)
+            .div(biomass_production)
+            .replace([np.nan, np.inf, -np.inf], 0)
+        )
+
+        # Calculate footprints
+        upstream_primary_footprint = S_primary_upstream.dot(biomass_footprint)
+        upstream_processed_footprint = S_processed_upstream.dot(biomass_footprint)
+        upstream_fertiliser_footprint = (
+            S_fertiliser_energy
+            .loc[:, biomass_footprint.index]
+            .dot(biomass_footprint)
+        )
+        fertiliser_input_footprint = (
+            S_fertiliser_input
+            .loc[:, biomass_footprint.index]
+            .dot(biomass_footprint)
+        )
+
+        upstream_primary_footprint_source = (
+            biomass_footprint.mul(S_primary_upstream_vector, axis=0)
+        )
+        upstream_processed_footprint_source = (
+            biomass_footprint.mul(S_processed_upstream_vector, axis=0)
+        )
+        fertiliser_input_footprint_source = (
+            biomass_footprint.mul(
+                S_fertiliser_input_vector.loc[biomass_footprint.index],
+                axis=0
+            )
+        )
+        fertiliser_energy_footprint_source = (
+            biomass_footprint.mul(
+                S_fertiliser_energy_vector.loc[biomass_footprint.index],
+                axis=0
+            )
+        )
+
+        energy_inputs = pd.concat([
+            upstream_primary_footprint,
+            upstream_processed_footprint,
+            upstream_fertiliser_footprint
+        ], axis=0, keys=["primary", "processed", "fertiliser"], names=["source"])
+
+        y_global = (
+            y_regions_cal
+            .groupby(["item", "comm_group", "group"])
+            .sum()
+            .rename_axis(["area"], axis=1)
+            .rename(iso3_mapper, axis=1)
+            .stack()
+            .reorder_levels(["area", "item", "comm_group", "group"])
+        )
+
+        y_global_other_losses = (
+            y_regions_cal_other_losses
+            .groupby(["item", "comm_group", "group"])
+            .sum()
+            .rename_axis(["area"], axis=1)
+            .rename(iso3_mapper, axis=1)
+            .stack()
+            .reorder_levels(["area", "item", "comm_group", "group"])
         )
-    )
 
-    other_results = pd.concat(
-        [
-            fertiliser_input_footprint,
-            (
+        energy_outputs = pd.concat(
+            [
+                y_global.to_frame("consumption").T,
+                y_global_other_losses.to_frame("other_losses").T
+            ],
+            axis=0,
+            keys=["consumption", "other_losses"],
+            names=["source"]
+        )
+
+        biomass_production_result = pd.concat(
+            [
                 biomass_production
                 .rename_axis(energy_inputs.columns.names)
-                .to_frame("biomass_production").T
-            ),
-            biomass_footprint.groupby("group_output").sum()
-        ],
-        keys=["fertiliser_input", "biomass_production", "biomass_footprint"],
-        names=["source"],
-        axis=0
-    )
+                .to_frame("biomass_production")
+                .T
+            ], axis=0, keys=["biomass_production"], names=["source"]
+        )
 
-    results = (
-        pd.concat([
-            energy_outputs,
-            energy_inputs,
-            other_results,
-            # biomass_output_result,
-        ], axis=0, keys=[
-            "energy_output",
-            "energy_input",
-            "other",
-            # "biomass_output"
-        ], names=["direction"])
-        .rename_axis(["direction", "source", "other"], axis=0)
-        .rename_axis(["area", "item", "comm_group", "group"], axis=1)
-    )
+        fertiliser_input_footprint_result = (
+            pd.concat(
+                [fertiliser_input_footprint],
+                keys=["fertiliser_input"],
+                names=["source"],
+                axis=0
+            )
+        )
 
-    dom_biomass_footprint = domestic_split(biomass_footprint)
-    dom_upstream_primary_footprint = (
-        domestic_split(upstream_primary_footprint_source)
-    )
-    dom_upstream_processed_footprint = (
-        domestic_split(upstream_processed_footprint_source)
-    )
-    dom_fertiliser_input_footprint = (
-        domestic_split(fertiliser_input_footprint_source)
-    )
-    dom_fertiliser_energy_footprint = (
-        domestic_split(fertiliser_energy_footprint_source)
-    )
+        other_results = pd.concat(
+            [
+                fertiliser_input_footprint,
+                (
+                    biomass_production
+                    .rename_axis(energy_inputs.columns.names)
+                    .to_frame("biomass_production").T
+                ),
+                biomass_footprint.groupby("group_output").sum()
+            ],
+            keys=["fertiliser_input", "biomass_production", "biomass_footprint"],
+            names=["source"],
+            axis=0
+        )
 
-    results_source = (
-        pd.concat([
-            dom_biomass_footprint,
-            dom_upstream_primary_footprint,
-            dom_upstream_processed_footprint,
-            dom_fertiliser_input_footprint,
-            dom_fertiliser_energy_footprint
-        ], keys=[
-            "biomass",
-            "primary_energy",
-            "processed_energy",
-            "fertiliser_input",
-            "fertiliser_energy"
-        ], names=["variable"])
-    )
+        results = (
+            pd.concat([
+                energy_outputs,
+                energy_inputs,
+                other_results,
+                # biomass_output_result,
+            ], axis=0, keys=[
+                "energy_output",
+                "energy_input",
+                "other",
+                # "biomass_output"
+            ], names=["direction"])
+            .rename_axis(["direction", "source", "other"], axis=0)
+            .rename_axis(["area", "item", "comm_group", "group"], axis=1)
+        )
 
+        if footprint_mode == "lazy":
+            # Split each region's grouped footprint, without the concatenated
+            # footprint of all regions
+            dom_biomass_footprint = pd.concat(
+                [
+                    fabio_functions.domestic_split(
+                        footprint,
+                        iso3_mapper[region],
+                        by=[
+                            "item_output",
+                            "comm_group_output",
+                            "group_output"
+                        ],
+                        level="area_output"
+                    )
+                    for region, footprint in zip(
+                        regions.area_ISO3.values, biomass_footprints[variant]
+                    )
+                ],
+                keys=[iso3_mapper[region] for region in regions.area_ISO3],
+                names=["area"],
+                axis=1
+            )
+        else:
+            dom_biomass_footprint = domestic_split(biomass_footprint)
+        dom_upstream_primary_footprint = (
+            domestic_split(upstream_primary_footprint_source)
+        )
+        dom_upstream_processed_footprint = (
+            domestic_split(upstream_processed_footprint_source)
+        )
+        dom_fertiliser_input_footprint = (
+            domestic_split(fertiliser_input_footprint_source)
+        )
+        dom_fertiliser_energy_footprint = (
+            domestic_split(fertiliser_energy_footprint_source)
+        )
 
-    # Save data
-    if exclude_negatives:
-        save_path = (
-            data_path
-            / "results"
-            / "excl_negatives"
-            / f"{year}"
+        results_source = (
+            pd.concat([
+                dom_biomass_footprint,
+                dom_upstream_primary_footprint,
+                dom_upstream_processed_footprint,
+                dom_fertiliser_input_footprint,
+                dom_fertiliser_energy_footprint
+            ], keys=[
+                "biomass",
+                "primary_energy",
+                "processed_energy",
+                "fertiliser_input",
+                "fertiliser_energy"
+            ], names=["variable"])
         )
 
-    else:
+
+        # Save data
         save_path = (
             data_path
             / "results"
-            / "incl_negatives"
+            / variant
             / f"{year}"
         )
-    os.makedirs(save_path, exist_ok=True)
-    results.to_csv(
-        save_path / "results_product.tsv", sep="\t"
-    )
+        os.makedirs(save_path, exist_ok=True)
+        results.to_csv(
+            save_path / "results_product.tsv", sep="\t"
+        )
 
-    results_source.to_csv(
-        save_path / "results_source_product.tsv", sep="\t"
-    )
+        results_source.to_csv(
+            save_path / "results_source_product.tsv", sep="\t"
+        )
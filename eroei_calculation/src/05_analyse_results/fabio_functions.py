@@ -16,10 +16,674 @@ while this updated veersion was written by kajwan.rasul@ntnu.no
 
 """
 # %%
+import io
+import os
+import bz2
+import gzip
+import json
+import lzma
+import codecs
+import shutil
+import struct
+import hashlib
+import tempfile
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
 from scipy import sparse
-from rpy2 import robjects
+
+
+# %%
+# Pure-Python reader for the subset of the R serialisation format used by the
+# FABIO files: gzip/bzip2/xz compressed XDR, (named) lists, atomic vectors,
+# factors, data.frames, and S4 objects such as dgCMatrix.
+# See R's src/main/serialize.c for the format.
+
+# SEXP types
+_NILSXP = 0
+_SYMSXP = 1
+_LISTSXP = 2
+_CLOSXP = 3
+_ENVSXP = 4
+_PROMSXP = 5
+_LANGSXP = 6
+_CHARSXP = 9
+_LGLSXP = 10
+_INTSXP = 13
+_REALSXP = 14
+_CPLXSXP = 15
+_STRSXP = 16
+_DOTSXP = 17
+_VECSXP = 19
+_EXPRSXP = 20
+_RAWSXP = 24
+_S4SXP = 25
+
+# Pseudo SEXP types used only in the serialisation format
+_ALTREP_SXP = 238
+_ATTRLISTSXP = 239
+_ATTRLANGSXP = 240
+_BASEENV_SXP = 241
+_EMPTYENV_SXP = 242
+_GENERICREFSXP = 245
+_PERSISTSXP = 247
+_PACKAGESXP = 248
+_NAMESPACESXP = 249
+_BASENAMESPACE_SXP = 250
+_MISSINGARG_SXP = 251
+_UNBOUNDVALUE_SXP = 252
+_GLOBALENV_SXP = 253
+_NILVALUE_SXP = 254
+_REFSXP = 255
+
+_PAIRLIST_TYPES = (
+    _LISTSXP, _CLOSXP, _PROMSXP, _LANGSXP, _DOTSXP,
+    _ATTRLISTSXP, _ATTRLANGSXP
+)
+_ENVIRONMENT_SENTINELS = (
+    _BASEENV_SXP, _EMPTYENV_SXP, _BASENAMESPACE_SXP, _MISSINGARG_SXP,
+    _UNBOUNDVALUE_SXP, _GLOBALENV_SXP
+)
+
+# CHARSXP encoding flags (in the "levels" bits)
+_BYTES_MASK = 1 << 1
+_LATIN1_MASK = 1 << 2
+_UTF8_MASK = 1 << 3
+
+_NA_INTEGER = -2**31
+
+
+class _RS4():
+    """S4 object read by `read_rds`, with rpy2-like access to the slots."""
+
+    def __init__(self, slots):
+        self.slots = slots
+
+    def do_slot(self, name):
+        return self.slots[name]
+
+
+class _RDSParser():
+    """Recursive-descent parser of an uncompressed XDR serialisation stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.references = []
+        self.encoding = "utf-8"
+
+    def _read(self, n_bytes):
+        data = self.stream.read(n_bytes)
+        if len(data) != n_bytes:
+            raise EOFError("Unexpected end of RDS file")
+        return data
+
+    def _int(self):
+        return struct.unpack(">i", self._read(4))[0]
+
+    def _length(self):
+        length = self._int()
+        if length == -1:
+            # Long vector
+            upper, lower = struct.unpack(">II", self._read(8))
+            length = (upper << 32) + lower
+        return length
+
+    def _array(self, dtype, length):
+        dtype = np.dtype(dtype)
+        return (
+            np.frombuffer(self._read(length * dtype.itemsize), dtype=dtype)
+            .astype(dtype.newbyteorder("="))
+        )
+
+    def parse(self):
+        if self._read(2) != b"X\n":
+            raise ValueError("Only binary XDR RDS files are supported")
+
+        version = self._int()
+        self._int()  # R version that wrote the file
+        self._int()  # Minimal R version to read the file
+        if version == 3:
+            native_encoding = self._read(self._int()).decode("ascii")
+            try:
+                self.encoding = codecs.lookup(native_encoding).name
+            except LookupError:
+                pass
+        elif version != 2:
+            raise ValueError(f"Unsupported serialisation version {version}")
+
+        return self._item()
+
+    def _item(self, flags=None):
+        if flags is None:
+            flags = self._int()
+        sexptype = flags & 0xFF
+        levels = flags >> 12
+        has_attr = bool(flags & (1 << 9))
+        has_tag = bool(flags & (1 << 10))
+
+        if sexptype in (_NILVALUE_SXP, _NILSXP):
+            return None
+        if sexptype in _ENVIRONMENT_SENTINELS:
+            return None
+        if sexptype == _REFSXP:
+            index = flags >> 8
+            if index == 0:
+                index = self._int()
+            return self.references[index - 1]
+        if sexptype in (_PERSISTSXP, _PACKAGESXP, _NAMESPACESXP):
+            self._int()  # Always 0
+            value = [self._item() for _ in range(self._int())]
+            self.references.append(value)
+            return value
+        if sexptype == _SYMSXP:
+            # Symbols are returned as their name
+            value = self._item()
+            self.references.append(value)
+            return value
+        if sexptype == _ENVSXP:
+            self._int()  # Locked
+            value = {}
+            self.references.append(value)
+            self._item()  # Enclosure
+            frame = self._item()
+            self._item()  # Hash table
+            self._item()  # Attributes
+            if frame:
+                value.update(dict(frame))
+            return value
+        if sexptype in _PAIRLIST_TYPES:
+            return self._pairlist(flags)
+        if sexptype == _ALTREP_SXP:
+            return self._altrep()
+        if sexptype == _CHARSXP:
+            return self._string(levels)
+
+        if sexptype in (_LGLSXP, _INTSXP):
+            value = self._array(">i4", self._length())
+        elif sexptype == _REALSXP:
+            value = self._array(">f8", self._length())
+        elif sexptype == _CPLXSXP:
+            value = self._array(">c16", self._length())
+        elif sexptype == _STRSXP:
+            value = np.empty(self._length(), dtype=object)
+            value[:] = [self._item() for _ in range(len(value))]
+        elif sexptype in (_VECSXP, _EXPRSXP):
+            value = [self._item() for _ in range(self._length())]
+        elif sexptype == _RAWSXP:
+            value = np.frombuffer(self._read(self._length()), np.uint8)
+        elif sexptype == _S4SXP:
+            value = None
+        else:
+            raise NotImplementedError(
+                f"R object type {sexptype} is not supported by read_rds"
+            )
+
+        attributes = self._attributes() if has_attr else {}
+        return _convert(sexptype, value, attributes)
+
+    def _string(self, levels):
+        length = self._int()
+        if length == -1:
+            return None  # NA_character_
+        data = self._read(length)
+        if levels & _UTF8_MASK:
+            return data.decode("utf-8")
+        if levels & (_LATIN1_MASK | _BYTES_MASK):
+            return data.decode("latin-1")
+        return data.decode(self.encoding, errors="replace")
+
+    def _attributes(self):
+        attributes = self._item()
+        return dict(attributes) if attributes else {}
+
+    def _pairlist(self, flags):
+        """Read a pairlist as a list of (tag, value) tuples.
+
+        The CDR chain is followed iteratively, so long pairlists do not hit
+        the recursion limit.
+        """
+        items = []
+        while True:
+            sexptype = flags & 0xFF
+            if flags & (1 << 9) or sexptype in (_ATTRLISTSXP, _ATTRLANGSXP):
+                self._item()  # Attributes of the cell
+            tag = self._item() if flags & (1 << 10) else None
+            items.append((tag, self._item()))
+
+            flags = self._int()
+            if flags & 0xFF not in _PAIRLIST_TYPES:
+                break
+
+        tail = self._item(flags)
+        if tail is not None:
+            items.append((None, tail))
+        return items
+
+    def _altrep(self):
+        info = self._item()
+        state = self._item()
+        attributes = self._item()
+        attributes = dict(attributes) if attributes else {}
+
+        class_name = info[0][1]
+        sexptype = int(info[2][1][0])
+        if class_name in ("compact_intseq", "compact_realseq"):
+            length, start, step = state
+            value = start + step * np.arange(int(length))
+            if class_name == "compact_intseq":
+                value = value.astype(np.int32)
+        elif class_name.startswith("wrap_"):
+            value = state[0][1]
+        elif class_name == "deferred_string":
+            # Character version of a numeric vector
+            numbers = state[0][1]
+            value = np.empty(len(numbers), dtype=object)
+            value[:] = [
+                None if np.isnan(number) else format(number, ".15g")
+                for number in np.asarray(numbers, dtype=float)
+            ]
+        else:
+            raise NotImplementedError(
+                f"ALTREP class {class_name} is not supported by read_rds"
+            )
+        return _convert(sexptype, value, attributes)
+
+
+def _convert(sexptype, value, attributes):
+    """Convert an R object with its attributes into a Python object."""
+    if sexptype == _S4SXP:
+        return _RS4(attributes)
+
+    r_class = attributes.get("class")
+    r_class = [] if r_class is None else list(r_class)
+    names = attributes.get("names")
+
+    if "data.frame" in r_class:
+        df = pd.DataFrame(dict(zip(names, value)))
+        row_names = attributes.get("row.names")
+        if row_names is not None and row_names.dtype == object:
+            df.index = row_names
+        return df
+
+    if "factor" in r_class:
+        codes = value.astype(np.int64) - 1
+        codes[value == _NA_INTEGER] = -1
+        return pd.Categorical.from_codes(
+            codes,
+            categories=attributes["levels"],
+            ordered="ordered" in r_class
+        )
+
+    if sexptype in (_LGLSXP, _INTSXP):
+        missing = value == _NA_INTEGER
+        if missing.any():
+            value = value.astype(float)
+            value[missing] = np.nan
+        elif sexptype == _LGLSXP:
+            value = value.astype(bool)
+
+    if sexptype in (_VECSXP, _EXPRSXP):
+        if names is not None:
+            return dict(zip(names, value))
+        return value
+
+    dim = attributes.get("dim")
+    if dim is not None:
+        value = value.reshape(tuple(dim), order="F")
+
+    return value
+
+
+def read_rds(file_path):
+    """
+    Read an RDS file without R.
+
+    Supports the subset of the R serialisation format used by the FABIO
+    files: compressed XDR files with (named) lists, numeric, logical and
+    character vectors, matrices, factors, data.frames and S4 objects
+    (e.g. dgCMatrix).
+
+    Parameters
+    ----------
+    file_path : STR, Path
+        Path to the RDS file.
+
+    Returns
+    -------
+    rds_file : dict, list, np.ndarray, pd.DataFrame, pd.Categorical
+        The deserialised object. Named lists are returned as dict and S4
+        objects expose their slots with `do_slot()`, like rpy2.
+    """
+    with open(file_path, "rb") as file:
+        magic = file.read(6)
+
+    if magic.startswith(b"\x1f\x8b"):
+        opener = gzip.open
+    elif magic.startswith(b"BZh"):
+        opener = bz2.open
+    elif magic.startswith(b"\xfd7zXZ"):
+        opener = lzma.open
+    else:
+        opener = open
+
+    with opener(file_path, "rb") as stream:
+        return _RDSParser(io.BufferedReader(stream, 2**20)).parse()
+
+
+# %%
+def _select(rds_object, name):
+    """Select an element by name from a named R list (either backend)."""
+    if isinstance(rds_object, dict):
+        return rds_object[name]
+    return rds_object.rx2(name)
+
+
+def _dgCMatrix_to_csc(rds_object):
+    """Turn an R dgCMatrix into a scipy.sparse.csc_matrix without densifying.
+    """
+    # Sparse matrix specs
+    data = rds_object.do_slot('x')  # in R: x@x
+    indices = rds_object.do_slot('i')  # in R: x@i
+    indptr = rds_object.do_slot('p')  # in R: x@p
+    shape = rds_object.do_slot('Dim')  # in R: x@Dim or dim(x)
+
+    return sparse.csc_matrix(
+        (np.asarray(data), np.asarray(indices), np.asarray(indptr)),
+        tuple(shape)
+    )
+
+
+def _names_to_array(names):
+    """Turn R dimnames (character vector or NULL) into a np.ndarray or None.
+    """
+    if names is None or type(names).__name__ == "NULLType":
+        return None
+    return np.asarray(list(names), dtype=str)
+
+
+def _file_hash(file_path, chunk_size=2**26):
+    """SHA-256 of a file, read in chunks."""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _cache_load(entry_path, names):
+    """
+    Memory-map the arrays of a cache entry.
+
+    Returns None if the entry does not exist. Optional arrays that are not in
+    the entry are returned as None.
+    """
+    if not entry_path.is_dir():
+        return None
+    return {
+        name: (
+            np.load(entry_path / f"{name}.npy", mmap_mode="r")
+            if (entry_path / f"{name}.npy").exists()
+            else None
+        )
+        for name in names
+    }
+
+
+def _cache_save(entry_path, arrays):
+    """
+    Write the arrays of a cache entry as raw .npy files.
+
+    The entry is written to a temporary folder and moved into place, so that
+    parallel workers never see half-written entries.
+    """
+    os.makedirs(entry_path.parent, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(dir=entry_path.parent))
+    for name, array in arrays.items():
+        if array is not None:
+            np.save(tmp_path / f"{name}.npy", np.asarray(array))
+    try:
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        # Another process wrote the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _write_json(file_path, data):
+    """Write a JSON file atomically, so that readers never see it half-written.
+    """
+    descriptor, tmp_path = tempfile.mkstemp(dir=file_path.parent)
+    with os.fdopen(descriptor, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, file_path)
+
+
+def _source_cache_dir(source_path, cache_path):
+    """
+    Cache folder of an RDS file, validated against the source file.
+
+    The cache key is the size, modification time and SHA-256 hash of the
+    source file. The hash is only recomputed when the size or modification
+    time changed, and stale entries are removed. Parallel workers validate
+    the folder one at a time (where file locks are available), so that only
+    the first removes stale entries and none removes the entries of another.
+
+    Parameters
+    ----------
+    source_path : Path
+        Path to the RDS file.
+    cache_path : Path
+        Cache folder of the database folder.
+
+    Returns
+    -------
+    cache_dir : Path
+    """
+    cache_dir = cache_path / source_path.name.replace(".rds", "")
+    key_path = cache_dir / "source.json"
+
+    os.makedirs(cache_path, exist_ok=True)
+    with open(cache_path / f"{cache_dir.name}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        stat = os.stat(source_path)
+        key = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        cached_key = {}
+        if key_path.exists():
+            with open(key_path) as file:
+                cached_key = json.load(file)
+
+        if (
+            cached_key.get("size") != key["size"]
+            or cached_key.get("mtime") != key["mtime"]
+        ):
+            key["hash"] = _file_hash(source_path)
+            if (
+                cached_key.get("size") != key["size"]
+                or cached_key.get("hash") != key["hash"]
+            ):
+                print(f"Creating binary cache for {source_path}")
+                # Without a key there is nothing stale to remove yet
+                if cached_key:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_json(key_path, key)
+
+    return cache_dir
+
+
+def _rds_reader(backend):
+    """RDS reading function of a backend, "python" or "rpy2"."""
+    if backend == "python":
+        return read_rds
+    if backend == "rpy2":
+        # Only start an embedded R interpreter when asked for
+        from rpy2 import robjects
+        return robjects.r['readRDS']
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def _names(rds_object):
+    """Names of a named R list (either backend)."""
+    if isinstance(rds_object, dict):
+        return list(rds_object.keys())
+    return list(rds_object.names)
+
+
+def _E_frame(rds_file_year, regions=None):
+    """
+    Satellite accounts of one year of E.rds as a pd.DataFrame.
+
+    A year is a data.frame or a named list of columns, as read by either
+    backend. Without an area column, the area names are mapped from the
+    area codes if regions is given.
+    """
+    if isinstance(rds_file_year, pd.DataFrame):
+        df = rds_file_year.copy()
+    else:
+        columns = {}
+        for key in _names(rds_file_year):
+            try:
+                columns[key] = np.asarray(_select(rds_file_year, key))
+            except UnicodeDecodeError:
+                # rpy2 can not decode the latin1 area names
+                continue
+        df = pd.DataFrame.from_dict(columns)
+
+    if (
+        regions is not None
+        and "area" not in df.columns
+        and "area_code" in df.columns
+    ):
+        df.insert(
+            df.columns.get_loc("area_code") + 1,
+            "area",
+            df["area_code"].map(regions.set_index("area_code")["area"])
+        )
+
+    return df
+
+
+def read_E_all_years(
+        path,
+        cache_path=None,
+        use_cache=True,
+        backend="python",
+        ):
+    """
+    Import E (satellite accounts) for all years as one tidy table.
+
+    Only E.rds is needed, the label tables of the database are optional:
+    regions.csv is only used to add area names when E has none. The table
+    is saved in the binary cache the first time, so the satellite accounts
+    are only extracted once for the whole project. Repeated labels (area,
+    item, commodity group, ...) are stored as categoricals.
+
+    Parameters
+    ----------
+    path : STR, Path
+        Folder with E.rds.
+    cache_path : STR, Path, optional
+        Folder of the binary conversion cache, as in read().
+    use_cache : BOOL, optional
+        Save the table in the binary cache and read it from there.
+    backend : STR, optional
+        RDS reader, "python" or "rpy2", as in read().
+
+    Returns
+    -------
+    df : pd.DataFrame()
+        Pandas dataframe with a "year" column, the label columns and one
+        column per satellite account (e.g. landuse, biomass).
+    """
+    path = Path(path)
+    cache_file = None
+    if use_cache:
+        if cache_path is None:
+            cache_path = path.parent / "cache"
+        cache_file = (
+            _source_cache_dir(path / "E.rds", Path(cache_path) / path.name)
+            / "E_all_years.feather"
+        )
+        if cache_file.exists():
+            return pd.read_feather(cache_file)
+
+    regions = None
+    if (path / "regions.csv").exists():
+        regions = pd.read_csv(path / "regions.csv", encoding="ISO-8859-1")
+
+    print("Reading E (all years) ...")
+    rds_file = _rds_reader(backend)(str(path / "E.rds"))
+    file_years = _names(rds_file)
+
+    df = pd.concat(
+        [
+            _E_frame(_select(rds_file, file_year), regions)
+            for file_year in file_years
+        ],
+        keys=[int(year) for year in file_years],
+        names=["year"]
+    )
+    df = (
+        df
+        .reset_index(level="year")
+        .reset_index(drop=True)
+    )
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype("category")
+
+    if cache_file is not None:
+        df.to_feather(cache_file)
+
+    return df
+
+
+def _labels_to_index(labels):
+    """Turn a label table into a pd.Index (one column) or pd.MultiIndex."""
+    if labels.shape[1] == 1:
+        return pd.Index(labels.iloc[:, 0])
+    return pd.MultiIndex.from_frame(labels)
+
+
+def _reset_labels(labels):
+    """Label table with a default RangeIndex, without copying if it has one.
+    """
+    if labels.index.equals(pd.RangeIndex(len(labels))):
+        return labels
+    return labels.reset_index(drop=True)
+
+
+# Label tables and their MultiIndex, built once per process for all readers
+# of the same folder. A pd.MultiIndex stores each level as integer codes into
+# its unique labels. Readers get their own copies (see _shared_labels()),
+# but the indexes keep the identity of the cached one, so alignment (e.g.
+# Z.sum(axis=1) + Y.sum(axis=1)) stays an identity check.
+_LABEL_CACHE = {}
+
+
+def _shared_labels(labels):
+    """
+    Copies of cached labels for one reader.
+
+    Label tables are copied, so that changing them through one reader does
+    not change the others. An index is a view: a new object with its own
+    names, which shares the immutable levels and codes and is identical
+    (Index.is_) to the cached index.
+    """
+    return tuple(
+        label.view() if isinstance(label, pd.Index) else label.copy()
+        for label in labels
+    )
 
 
 class read():
@@ -29,23 +693,36 @@ class read():
     path: File path to the database.
     year: Year of the database.
     version: Version of the database.
-    readRDS: readRDS object from the robjects package.
+    backend: RDS reader, "python" (read_rds) or "rpy2" (R's readRDS).
+    readRDS: Function used to read the RDS files.
     items: Product names, codes, and other information.
     regions: Region and region codes codes.
     io_codes: Combined product and region codes.
+    io_index: pd.MultiIndex of io_codes, shared by all matrices.
     su_codes: Combined process and region codes.
     start_year: Fist available year of the database.
     end_year: Final available year of database.
+    cache_path: Folder of the binary conversion cache, or None if disabled.
 
     Methods
     -------
     E(): Returns pd.DataFrame with satellite accounts.
+    E_all_years(): Returns pd.DataFrame with satellite accounts of all years
+                in one tidy table.
     X(): Returns pd.Series with total product output.
-    Y(): Returns pd.DataFrame with final demand consumption.
-    L(version): Returns pd.DataFrame with the Leontief matrix, if available.
-                Version refers to the suffix used for the file name.
-    Z(version): Returns pd.DataFrame with the transaction matrix.
+    Y(sparse, final_demand, aggregate, complement): Returns pd.DataFrame
+                with final demand consumption, optionally filtered by final
+                demand category and aggregated, e.g. by consuming country.
+    L(version, sparse): Returns pd.DataFrame with the Leontief matrix, if
+                available. Version refers to the suffix used for the file
+                name.
+    Z(version, sparse): Returns pd.DataFrame with the transaction matrix.
                 Version refers to the suffix used for the file name.
+    L_blocks(version): Returns ColumnBlocks with memory-mapped access to a
+                Leontief matrix saved with save_column_blocks().
+
+    Y(), L() and Z() return a SparseFrame instead of a pd.DataFrame when
+    called with sparse=True.
 
     """
 
@@ -54,6 +731,9 @@ class read():
             path="data/",
             year=2013,
             version=1.1,
+            cache_path=None,
+            use_cache=True,
+            backend="python",
             ):
         """Read/import FABIO
         Parameters
@@ -64,6 +744,16 @@ class read():
             Year of the FABIO database.
         version : INT, FLOAT, optional
             FABIO version.
+        cache_path : STR, Path, optional
+            Folder of the binary conversion cache. Defaults to a `cache`
+            folder next to the database folder, so that e.g. the biomass and
+            calories versions share one cache.
+        use_cache : BOOL, optional
+            Convert each matrix to the binary cache the first time it is read
+            and memory-map it from there on later reads.
+        backend : STR, optional
+            "python" reads the RDS files with the built-in `read_rds`, which
+            does not need R. "rpy2" uses R's readRDS through rpy2.
 
         Returns
         -------
@@ -77,7 +767,20 @@ class read():
         print(f"FABIO year {self.year}")
         print(f"FABIO path {self.path}")
 
-        self.readRDS = robjects.r['readRDS']
+        self.backend = backend
+        self.readRDS = _rds_reader(self.backend)
+
+        # Deserialised multi-year RDS files, kept between years
+        self._rds_files = {}
+
+        # Binary conversion cache, one folder per database folder
+        if use_cache:
+            if cache_path is None:
+                cache_path = Path(self.path).parent / "cache"
+            self.cache_path = Path(cache_path) / Path(self.path).name
+        else:
+            self.cache_path = None
+        self._cache_dirs = {}
 
         # Items
         self.items = pd.read_csv(
@@ -95,8 +798,16 @@ class read():
         # TODO: ... Group category is missing from the items.csv.
         # IO-codes
         # 192 regions * 125 items = 24000 codes
-        self.io_codes = pd.read_csv(
-            f"{self.path}/io_codes.csv"
+        io_codes_key = ("io_codes", str(Path(self.path).resolve()))
+        if io_codes_key not in _LABEL_CACHE:
+            io_codes = pd.read_csv(
+                f"{self.path}/io_codes.csv"
+            )
+            _LABEL_CACHE[io_codes_key] = (
+                io_codes, pd.MultiIndex.from_frame(io_codes)
+            )
+        self.io_codes, self.io_index = _shared_labels(
+            _LABEL_CACHE[io_codes_key]
         )
 
         # SU-codes
@@ -114,6 +825,121 @@ class read():
             self.start_year = 1986
             self.end_year = 2020
 
+    def _read_rds(self, file_name, keep=True):
+        """
+        Deserialise an RDS file in the database folder.
+
+        Multi-year files (Z, Y, X, E) are kept on the reader, so that changing
+        `year` does not deserialise the whole file again.
+
+        Parameters
+        ----------
+        file_name : STR
+            Name of the RDS file.
+        keep : BOOL, optional
+            Keep the deserialised file for later calls.
+
+        Returns
+        -------
+        rds_file : R object
+            The deserialised RDS file.
+        """
+        if file_name in self._rds_files:
+            return self._rds_files[file_name]
+
+        rds_file = self.readRDS(f"{self.path}/{file_name}")
+        if keep:
+            self._rds_files[file_name] = rds_file
+
+        return rds_file
+
+    def _cache_dir(self, file_name):
+        """
+        Cache folder of an RDS file, validated against the source file.
+
+        See _source_cache_dir().
+
+        Parameters
+        ----------
+        file_name : STR
+            Name of the RDS file.
+
+        Returns
+        -------
+        cache_dir : Path or None
+            Cache folder of the file, or None if the cache is disabled.
+        """
+        if self.cache_path is None:
+            return None
+        if file_name not in self._cache_dirs:
+            self._cache_dirs[file_name] = _source_cache_dir(
+                Path(self.path) / file_name, self.cache_path
+            )
+        return self._cache_dirs[file_name]
+
+    def _read_matrix(self, file_name, year=None, keep=True):
+        """
+        Read a dgCMatrix from an RDS file, through the binary cache.
+
+        Parameters
+        ----------
+        file_name : STR
+            Name of the RDS file.
+        year : INT, optional
+            Year to select from a multi-year file. None for single matrices.
+        keep : BOOL, optional
+            Keep the deserialised RDS file for later calls.
+
+        Returns
+        -------
+        matrix : scipy.sparse.csc_matrix
+            The matrix, memory-mapped from the cache when available.
+        dimnames : list
+            Row and column names (np.ndarray or None).
+        """
+        cache_dir = self._cache_dir(file_name)
+        entry = "all" if year is None else str(year)
+        names = ["data", "indices", "indptr", "shape", "rownames", "colnames"]
+
+        if cache_dir is not None:
+            arrays = _cache_load(cache_dir / entry, names)
+            if arrays is not None:
+                matrix = sparse.csc_matrix(
+                    (arrays["data"], arrays["indices"], arrays["indptr"]),
+                    tuple(arrays["shape"]),
+                    copy=False
+                )
+                return matrix, [arrays["rownames"], arrays["colnames"]]
+
+        rds_file = self._read_rds(file_name, keep=keep)
+
+        if year is None:
+            rds_object = rds_file
+        else:
+            # Select year (string, not int)
+            rds_object = _select(rds_file, f"{year}")
+
+        matrix = _dgCMatrix_to_csc(rds_object)
+        dimnames = [
+            _names_to_array(names)
+            for names in rds_object.do_slot('Dimnames')
+        ]
+
+        if cache_dir is not None:
+            _cache_save(
+                cache_dir / entry,
+                dict(zip(names, [
+                    matrix.data,
+                    matrix.indices,
+                    matrix.indptr,
+                    np.array(matrix.shape),
+                    dimnames[0],
+                    dimnames[1]
+                ]))
+            )
+
+        return matrix, dimnames
+
     def E(self):
         """
         Import E (satellite accounts).
@@ -128,20 +954,35 @@ class read():
         print("Reading E ...")
 
         # Read RDS file
-        rds_file = self.readRDS(f"{self.path}/E.rds")
+        rds_file = self._read_rds("E.rds")
 
         # Extract year
-        rds_file_year = rds_file[rds_file.names.index(f"{self.year}")]
-
-        # Create index from dict
-        df = pd.DataFrame.from_dict(
-            {
-                key: np.asarray(rds_file_year.rx2(key))
-                for key in rds_file_year.names
-            }
-        )
+        rds_file_year = _select(rds_file, f"{self.year}")
 
-        return df
+        return _E_frame(rds_file_year, self.regions)
+
+    def E_all_years(self):
+        """
+        Import E (satellite accounts) for all years as one tidy table.
+
+        See read_E_all_years(), which does not need the label tables and
+        can be used without a reader.
+
+        Returns
+        -------
+        df : pd.DataFrame()
+            Pandas dataframe with a "year" column, the label columns and one
+            column per satellite account (e.g. landuse, biomass).
+
+        """
+        return read_E_all_years(
+            self.path,
+            cache_path=(
+                None if self.cache_path is None else self.cache_path.parent
+            ),
+            use_cache=self.cache_path is not None,
+            backend=self.backend
+        )
 
     def X(self):
         """
@@ -156,9 +997,18 @@ class read():
         """
         print("Reading X ...")
 
-        rds_file = self.readRDS(f"{self.path}/X.rds")
+        cache_dir = self._cache_dir("X.rds")
+        arrays = None
+        if cache_dir is not None:
+            arrays = _cache_load(cache_dir / "all", ["X"])
 
-        df = pd.DataFrame(np.array(rds_file))
+        if arrays is None:
+            rds_file = self._read_rds("X.rds")
+            arrays = {"X": np.array(rds_file)}
+            if cache_dir is not None:
+                _cache_save(cache_dir / "all", arrays)
+
+        df = pd.DataFrame(arrays["X"])
 
         df.columns = list(range(self.start_year, self.end_year+1))
 
@@ -169,82 +1019,142 @@ class read():
         df.columns = [str(self.year)]
 
         # Add MultiIndex
-        df.index = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.index = self.io_index
 
         return df
 
-    def Y(self):
+    def Y(
+            self,
+            sparse=False,
+            final_demand=None,
+            aggregate=None,
+            complement=False
+            ):
         """
         Import Y (final demand).
 
+        The category filter and the aggregation are done on the sparse matrix
+        (the aggregation as a product with a 0/1 aggregation matrix), so only
+        the compact result is densified.
+
+        Parameters
+        ----------
+        sparse : BOOL, optional
+            Return a SparseFrame instead of a dense pd.DataFrame.
+        final_demand : list, optional
+            Only keep these final demand categories, e.g. ["food", "losses"].
+        aggregate : STR, list, optional
+            Sum the columns by these column labels, e.g. "iso3c" gives one
+            column per consuming country.
+        complement : BOOL, optional
+            Keep the final demand categories not in `final_demand` instead.
+
         Returns
         -------
-        df : pd.DataFrame()
+        df : pd.DataFrame() or SparseFrame()
             Pandas dataframe containing the final demand.
 
         """
         print("Reading Y ... ")
 
-        rds_file = self.readRDS(f"{self.path}/Y.rds")
-
-        # Select year (string, not int)
-        rds_year = rds_file.rx2(f"{self.year}")
+        rds_year_matrix, dimnames = self._read_matrix("Y.rds", self.year)
 
-        # Sparse matrix specs
-        data = rds_year.do_slot('x')  # in R: x@x
-        indices = rds_year.do_slot('i')  # in R: x@i
-        indptr = rds_year.do_slot('p')  # in R: x@p
-        shape = rds_year.do_slot('Dim')  # in R: x@Dim or dim(x)
-        dimnames = rds_year.do_slot('Dimnames')
-
-        # Turn into amtrix
-        rds_year_matrix = sparse.csc_matrix(
-            (data, indices, indptr),
-            tuple(shape)
+        # Add MultiIndex (columns)
+        self.final_demand_categories, col_index, columns = (
+            self._final_demand_labels(dimnames[1])
         )
 
+        if final_demand is not None or aggregate is not None:
+            df = SparseFrame(
+                rds_year_matrix,
+                self.io_codes,
+                col_index,
+                pandas_index=(self.io_index, columns)
+            )
+            if final_demand is not None:
+                df = df.select_labels(
+                    "final demand", final_demand, complement=complement
+                )
+            if aggregate is not None:
+                df = df.groupby(aggregate, axis=1)
+
+            if sparse:
+                return df
+            return df.to_frame()
+
+        if sparse:
+            return SparseFrame(
+                rds_year_matrix,
+                self.io_codes,
+                col_index,
+                pandas_index=(self.io_index, columns)
+            )
+
         # Turn into array
-        data_array = sparse.csc_matrix.toarray(rds_year_matrix)
+        data_array = rds_year_matrix.toarray()
 
         # Turn to Pandas
         df = pd.DataFrame(data_array)
 
         # Add MultiIndex (rows)
-        df.index = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.index = self.io_index
+
+        df.columns = columns
+
+        return df
+
+    def _final_demand_labels(self, colnames):
+        """
+        Column labels of Y, built once per process for each set of column
+        names.
+
+        Parameters
+        ----------
+        colnames : np.ndarray
+            Column names of Y, as "{area_code}_{final demand}".
+
+        Returns
+        -------
+        final_demand_categories : pd.DataFrame
+            Area code and final demand category of each column.
+        col_index : pd.DataFrame
+            Column label table, merged with the regions.
+        columns : pd.MultiIndex
+            MultiIndex of col_index.
+        """
+        key = ("Y", str(Path(self.path).resolve()), tuple(colnames))
+        if key in _LABEL_CACHE:
+            return _shared_labels(_LABEL_CACHE[key])
 
-        # Add MultiIndex (columns)
         region_index = self.regions
 
-        self.final_demand_categories = (
-            pd.Series(list(dimnames[1]))
+        final_demand_categories = (
+            pd.Series(list(colnames))
             .str.split("_", n=1, expand=True)
             .rename({
                 0: "area_code",
                 1: "final demand"
             }, axis=1)
         )
-        self.final_demand_categories["area_code"] = (
-            self.final_demand_categories["area_code"].astype("int64")
+        final_demand_categories["area_code"] = (
+            final_demand_categories["area_code"].astype("int64")
         )
 
         col_index = pd.merge(
             region_index,
-            self.final_demand_categories,
+            final_demand_categories,
             on="area_code",
             how="outer"
         )
 
-        df.columns = pd.MultiIndex.from_frame(
-            col_index
+        _LABEL_CACHE[key] = (
+            final_demand_categories,
+            col_index,
+            pd.MultiIndex.from_frame(col_index)
         )
+        return _shared_labels(_LABEL_CACHE[key])
 
-        return df
-
-    def L(self, version=None):
+    def L(self, version=None, sparse=False):
         """
         Import L (Leontief inverse matrix).
 
@@ -252,51 +1162,48 @@ class read():
         ----------
         version : STR, optional
             Wheter to use mass, value, or calorie (no_suffix) version.
+        sparse : BOOL, optional
+            Return a SparseFrame instead of a dense pd.DataFrame.
 
         Returns
         -------
-        df: pd.DataFrame()
+        df: pd.DataFrame() or SparseFrame()
             Pandas dataframe containing the Leontief inverse matrix.
         """
         print("Reading L")
 
         # Select file
         if version:
-            rds_file = self.readRDS(f"{self.path}/{self.year}_L_{version}.rds")
+            file_name = f"{self.year}_L_{version}.rds"
         else:
-            rds_file = self.readRDS(f"{self.path}/{self.year}_L.rds")
-
-        # Sparse matrix specs
-        data = rds_file.do_slot('x')  # in R: x@x
-        indices = rds_file.do_slot('i')  # in R: x@i
-        indptr = rds_file.do_slot('p')  # in R: x@p
-        shape = rds_file.do_slot('Dim')  # in R: x@Dim or dim(x)
+            file_name = f"{self.year}_L.rds"
 
         # Turn into matrix
-        rds_year_matrix = sparse.csc_matrix(
-            (data, indices, indptr),
-            tuple(shape)
-        )
+        rds_year_matrix, _ = self._read_matrix(file_name, keep=False)
+
+        if sparse:
+            return SparseFrame(
+                rds_year_matrix,
+                self.io_codes,
+                self.io_codes,
+                pandas_index=(self.io_index, self.io_index)
+            )
 
         # Turn into array
-        data_array = sparse.csc_matrix.toarray(rds_year_matrix)
+        data_array = rds_year_matrix.toarray()
 
         # Turn into pd.DataFrame
         df = pd.DataFrame(data_array)
 
         # Add MultiIndex (rows)
-        df.index = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.index = self.io_index
 
         # Add MultiIndex (columns)
-        df.columns = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.columns = self.io_index
 
         return df
 
-    def Z(self, version=None):
+    def Z(self, version=None, sparse=False):
         """
         Import Z (transactions matrix).
 
@@ -304,49 +1211,1313 @@ class read():
         ----------
         version : STR, optional
             Wheter to use mass, value, or calorie (no_suffix) version.
+        sparse : BOOL, optional
+            Return a SparseFrame instead of a dense pd.DataFrame.
 
         Returns
         -------
-        df : pd.DataFrame()
+        df : pd.DataFrame() or SparseFrame()
             Pandas dataframe containing the transaction matrix.
 
         """
         print("Reading Z...")
 
         if version:
-            rds_file = self.readRDS(f"{self.path}/Z_{version}.rds")
+            file_name = f"Z_{version}.rds"
         else:
-            rds_file = self.readRDS(f"{self.path}/Z.rds")
-
-        # Select year (string, not int)
-        rds_year = rds_file.rx2(f"{self.year}")
-
-        # Sparse matrix specs
-        data = rds_year.do_slot('x')  # in R: x@x
-        indices = rds_year.do_slot('i')  # in R: x@i
-        indptr = rds_year.do_slot('p')  # in R: x@p
-        shape = rds_year.do_slot('Dim')  # in R: x@Dim or dim(x)
+            file_name = "Z.rds"
 
         # Turn into matrix
-        rds_year_matrix = sparse.csc_matrix(
-            (data, indices, indptr),
-            tuple(shape)
-        )
+        rds_year_matrix, _ = self._read_matrix(file_name, self.year)
+
+        if sparse:
+            return SparseFrame(
+                rds_year_matrix,
+                self.io_codes,
+                self.io_codes,
+                pandas_index=(self.io_index, self.io_index)
+            )
 
         # Turn into array
-        data_array = sparse.csc_matrix.toarray(rds_year_matrix)
+        data_array = rds_year_matrix.toarray()
 
         # Turn into pd.DataFrame
         df = pd.DataFrame(data_array)
 
         # Add MultiIndex (rows)
-        df.index = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.index = self.io_index
 
         # Add MultiIndex (columns)
-        df.columns = pd.MultiIndex.from_frame(
-            self.io_codes
-        )
+        df.columns = self.io_index
 
         return df
+
+    def L_blocks(self, version="mass_incl_negatives"):
+        """
+        Open a Leontief matrix saved by 03_biomass_footprint with
+        save_column_blocks(), without reading it into memory.
+
+        Parameters
+        ----------
+        version : STR, optional
+            Suffix of the saved matrix, e.g. "mass_incl_negatives".
+
+        Returns
+        -------
+        L : ColumnBlocks()
+            Memory-mapped Leontief matrix.
+        """
+        return ColumnBlocks(Path(self.path) / f"L_{self.year}_{version}")
+
+
+class SparseFrame():
+    """
+    Sparse matrix with row and column label tables.
+
+    Lightweight alternative to a dense pd.DataFrame for the FABIO matrices.
+    The values are kept as a scipy.sparse.csc_matrix, while the labels are kept
+    as pd.DataFrames with one row per matrix row/column (e.g. io_codes).
+
+    Attributes
+    ----------
+    matrix: scipy.sparse.csc_matrix with the values.
+    index: pd.DataFrame with the row labels.
+    columns: pd.DataFrame with the column labels.
+    shape: Shape of the matrix.
+
+    Methods
+    -------
+    sum(axis): Returns pd.Series with row (axis=1) or column (axis=0) sums.
+    mul(other, axis): Returns SparseFrame scaled by a vector.
+    div(other, axis): Returns SparseFrame divided by a vector.
+    select(mask, axis): Returns SparseFrame with a subset of rows/columns.
+    select_labels(label, values, axis, complement): Returns SparseFrame with
+                the rows/columns whose label is in values.
+    groupby(by, axis): Returns SparseFrame summed over label groups.
+    to_frame(): Returns the dense pd.DataFrame, as returned by `read`.
+
+    """
+
+    def __init__(self, matrix, index, columns, pandas_index=(None, None)):
+        """
+        Parameters
+        ----------
+        matrix : scipy.sparse matrix
+            Values of the matrix.
+        index : pd.DataFrame
+            Row labels, one row per matrix row.
+        columns : pd.DataFrame
+            Column labels, one row per matrix column.
+        pandas_index : tuple, optional
+            Prebuilt pd.Index/pd.MultiIndex of the row and column labels, to
+            share with other matrices. Built on first use if None.
+
+        Returns
+        -------
+        None.
+        """
+        self.matrix = sparse.csc_matrix(matrix)
+        self.index = _reset_labels(index)
+        self.columns = _reset_labels(columns)
+        self._pandas_index = list(pandas_index)
+
+        if self.matrix.shape != (len(self.index), len(self.columns)):
+            raise ValueError(
+                f"Shape of matrix {self.matrix.shape} does not match labels "
+                f"{(len(self.index), len(self.columns))}"
+            )
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def _labels(self, axis):
+        return self.index if axis == 0 else self.columns
+
+    def _pandas(self, axis):
+        """pd.Index/pd.MultiIndex of an axis, built once."""
+        if self._pandas_index[axis] is None:
+            self._pandas_index[axis] = _labels_to_index(self._labels(axis))
+        return self._pandas_index[axis]
+
+    def sum(self, axis=0):
+        """
+        Sum along an axis, following the pd.DataFrame.sum() convention.
+
+        Parameters
+        ----------
+        axis : INT, optional
+            0 sums over rows (one value per column), 1 sums over columns (one
+            value per row).
+
+        Returns
+        -------
+        df : pd.Series()
+            Pandas series labelled by the remaining axis.
+
+        """
+        values = np.asarray(self.matrix.sum(axis=axis)).ravel()
+        return pd.Series(values, index=self._pandas(1 - axis))
+
+    def mul(self, other, axis=0):
+        """
+        Scale rows (axis=0) or columns (axis=1) by a vector.
+
+        Parameters
+        ----------
+        other : pd.Series, np.ndarray
+            Vector with one value per row (axis=0) or column (axis=1).
+            A pd.Series is used in the order of its values, so it must
+            follow the order of the labels.
+        axis : INT, optional
+            Axis to align the vector with.
+
+        Returns
+        -------
+        df : SparseFrame()
+            Scaled matrix.
+
+        """
+        vector = np.asarray(other, dtype=float).ravel()
+        if len(vector) != self.shape[axis]:
+            raise ValueError(
+                f"Vector of length {len(vector)} does not match axis {axis} "
+                f"of length {self.shape[axis]}"
+            )
+        diagonal = sparse.diags(vector)
+        if axis == 0:
+            matrix = diagonal @ self.matrix
+        else:
+            matrix = self.matrix @ diagonal
+        return SparseFrame(
+            matrix, self.index, self.columns, pandas_index=self._pandas_index
+        )
+
+    def div(self, other, axis=0):
+        """
+        Divide rows (axis=0) or columns (axis=1) by a vector.
+
+        Division by zero gives zero, similar to
+        `df.div(other).replace([np.nan, np.inf, -np.inf], 0)`.
+
+        Parameters
+        ----------
+        other : pd.Series, np.ndarray
+            Vector with one value per row (axis=0) or column (axis=1).
+        axis : INT, optional
+            Axis to align the vector with.
+
+        Returns
+        -------
+        df : SparseFrame()
+            Divided matrix.
+
+        """
+        vector = np.asarray(other, dtype=float).ravel()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = np.where(vector != 0, 1 / vector, 0)
+        inverse[~np.isfinite(inverse)] = 0
+        return self.mul(inverse, axis=axis)
+
+    def select(self, mask, axis=1):
+        """
+        Select a subset of rows (axis=0) or columns (axis=1).
+
+        Parameters
+        ----------
+        mask : np.ndarray, pd.Series
+            Boolean mask or integer positions along the axis.
+        axis : INT, optional
+            Axis to select from.
+
+        Returns
+        -------
+        df : SparseFrame()
+            Matrix with the selected rows/columns.
+
+        """
+        positions = np.asarray(mask)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        if axis == 0:
+            return SparseFrame(
+                self.matrix.tocsr()[positions, :],
+                self.index.iloc[positions],
+                self.columns,
+                pandas_index=(None, self._pandas_index[1])
+            )
+        return SparseFrame(
+            self.matrix[:, positions],
+            self.index,
+            self.columns.iloc[positions],
+            pandas_index=(self._pandas_index[0], None)
+        )
+
+    def select_labels(self, label, values, axis=1, complement=False):
+        """
+        Select the rows (axis=0) or columns (axis=1) whose label is in values.
+
+        Parameters
+        ----------
+        label : STR
+            Label column to select on, e.g. "final demand".
+        values : list
+            Labels to keep.
+        axis : INT, optional
+            Axis to select from.
+        complement : BOOL, optional
+            Keep the rows/columns whose label is not in values instead.
+
+        Returns
+        -------
+        df : SparseFrame()
+            Matrix with the selected rows/columns.
+
+        """
+        selection = self._labels(axis)[label].isin(values).values
+        if complement:
+            selection = ~selection
+        return self.select(selection, axis=axis)
+
+    def groupby(self, by, axis=1):
+        """
+        Sum rows (axis=0) or columns (axis=1) with the same labels.
+
+        The aggregation is a sparse product with a 0/1 aggregation matrix, so
+        the matrix is never densified.
+
+        Parameters
+        ----------
+        by : STR, list
+            Label column(s) to group by, e.g. "iso3c".
+        axis : INT, optional
+            Axis to aggregate.
+
+        Returns
+        -------
+        df : SparseFrame()
+            Aggregated matrix. Groups are sorted, as in pd.DataFrame.groupby.
+
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        labels = self._labels(axis)
+        groups = labels.groupby(by, sort=True, dropna=False).ngroup().values
+        group_labels = (
+            labels
+            .loc[:, by]
+            .drop_duplicates()
+            .sort_values(by)
+            .reset_index(drop=True)
+        )
+        aggregation = sparse.csc_matrix(
+            (np.ones(len(groups)), (np.arange(len(groups)), groups)),
+            shape=(len(groups), len(group_labels))
+        )
+        if axis == 0:
+            return SparseFrame(
+                aggregation.T @ self.matrix,
+                group_labels,
+                self.columns,
+                pandas_index=(None, self._pandas_index[1])
+            )
+        return SparseFrame(
+            self.matrix @ aggregation,
+            self.index,
+            group_labels,
+            pandas_index=(self._pandas_index[0], None)
+        )
+
+    def to_frame(self):
+        """
+        Densify into a pd.DataFrame with MultiIndex rows and columns.
+
+        Returns
+        -------
+        df : pd.DataFrame()
+            Dense pandas dataframe.
+
+        """
+        return pd.DataFrame(
+            self.matrix.toarray(),
+            index=self._pandas(0),
+            columns=self._pandas(1)
+        )
+
+
+def save_column_blocks(df, save_path):
+    """
+    Save a labelled dense matrix in a memory-mappable column-block layout.
+
+    The values are saved column-major in `values.npy`, so the columns of each
+    region (or any other contiguous group of columns) are one contiguous block
+    on disk. The labels are saved as `index.csv` and `columns.csv`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Matrix with MultiIndex rows and columns, e.g. L.
+    save_path : Path
+        Folder to save the matrix in.
+
+    Returns
+    -------
+    None.
+    """
+    os.makedirs(save_path, exist_ok=True)
+
+    values = np.lib.format.open_memmap(
+        save_path / "values.npy",
+        mode="w+",
+        dtype=np.float64,
+        shape=df.shape,
+        fortran_order=True
+    )
+    values[:] = df.values
+    values.flush()
+    del values
+
+    df.index.to_frame(index=False).to_csv(
+        save_path / "index.csv", index=False
+    )
+    df.columns.to_frame(index=False).to_csv(
+        save_path / "columns.csv", index=False
+    )
+
+
+class ColumnBlocks():
+    """
+    Memory-mapped matrix saved with save_column_blocks().
+
+    Only the bytes of the requested column blocks are read from disk.
+
+    Attributes
+    ----------
+    values: np.memmap with the (column-major) values.
+    index: pd.DataFrame with the row labels.
+    columns: pd.DataFrame with the column labels.
+
+    Methods
+    -------
+    blocks(areas, items, level): Returns dict with one array view per area.
+    get(areas, items, level): Returns pd.DataFrame with the selected columns.
+
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path : Path
+            Folder the matrix was saved in.
+
+        Returns
+        -------
+        None.
+        """
+        self.path = Path(path)
+        self.values = np.load(self.path / "values.npy", mmap_mode="r")
+        self.index = pd.read_csv(self.path / "index.csv")
+        self.columns = pd.read_csv(self.path / "columns.csv")
+
+    def _positions(self, areas=None, items=None, level="area"):
+        """Column positions per area, optionally limited to some items."""
+        selection = pd.Series(True, index=self.columns.index)
+        if areas is not None:
+            selection &= self.columns[level].isin(areas)
+        if items is not None:
+            selection &= self.columns["item"].isin(items)
+
+        columns = self.columns[selection]
+        return {
+            area: group.index.values
+            for area, group in columns.groupby(level, sort=False)
+        }
+
+    def blocks(self, areas=None, items=None, level="area"):
+        """
+        Column blocks of the matrix as NumPy arrays.
+
+        The block of an area is a view on the memory-mapped file when its
+        columns are contiguous (always the case without an item filter).
+
+        Parameters
+        ----------
+        areas : list, optional
+            Areas to return blocks for. Defaults to all areas.
+        items : list, optional
+            Only return the columns of these items.
+        level : STR, optional
+            Column label used for the blocks, e.g. "area" or "iso3c".
+
+        Returns
+        -------
+        blocks : dict
+            Array with the block columns, by area.
+        """
+        blocks = {}
+        for area, positions in self._positions(areas, items, level).items():
+            start, stop = positions[0], positions[-1] + 1
+            if stop - start == len(positions):
+                blocks[area] = self.values[:, start:stop]
+            else:
+                blocks[area] = self.values[:, positions]
+        return blocks
+
+    def get(self, areas=None, items=None, level="area"):
+        """
+        Selected columns of the matrix as a labelled pd.DataFrame.
+
+        Parameters
+        ----------
+        areas : list, optional
+            Areas to return columns for. Defaults to all areas.
+        items : list, optional
+            Only return the columns of these items.
+        level : STR, optional
+            Column label used to select areas, e.g. "area" or "iso3c".
+
+        Returns
+        -------
+        df : pd.DataFrame()
+            Pandas dataframe with the selected columns.
+        """
+        positions = np.concatenate(
+            list(self._positions(areas, items, level).values())
+            or [np.array([], dtype=int)]
+        )
+        return pd.DataFrame(
+            self.values[:, positions],
+            index=_labels_to_index(self.index),
+            columns=_labels_to_index(self.columns.iloc[positions])
+        )
+
+
+def _labels_to_json(index):
+    return index.to_frame(index=False).to_json(orient="split", index=False)
+
+
+def _labels_from_json(labels):
+    labels = pd.read_json(
+        io.StringIO(labels), orient="split", dtype=False, convert_dates=False
+    )
+    return _labels_to_index(labels)
+
+
+def save_matrix(df, save_path, compression=None, chunk_columns=1024):
+    """
+    Save a labelled dense matrix as a binary (Arrow IPC) file.
+
+    The values are stored column-major as one float64 column, in record
+    batches of chunk_columns matrix columns, each compressed separately
+    when compression is given. The row and column labels are stored once,
+    in the file metadata.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Matrix, e.g. L or Y_iso3c.
+    save_path : Path
+        File to save, e.g. "L_2013_mass_incl_negatives.arrow".
+    compression : STR, optional
+        "zstd", "lz4" or None. A matrix saved without compression in a
+        single record batch, e.g. Y_iso3c, is loaded by load_matrix()
+        without copying. The default is None.
+    chunk_columns : INT, optional
+        Matrix columns per record batch. The default is 1024.
+
+    Returns
+    -------
+    None.
+    """
+    n_rows, n_columns = df.shape
+    chunk_columns = max(chunk_columns or n_columns, 1)
+    values = np.asfortranarray(df.values, dtype=np.float64)
+    schema = pa.schema(
+        [("values", pa.float64())],
+        metadata={
+            "shape": json.dumps([n_rows, n_columns]),
+            "chunk_columns": str(chunk_columns),
+            "index": _labels_to_json(df.index),
+            "columns": _labels_to_json(df.columns),
+        }
+    )
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(str(save_path), "wb") as sink:
+        with pa.ipc.new_file(sink, schema, options=options) as writer:
+            for start in range(0, n_columns, chunk_columns):
+                chunk = values[:, start:start + chunk_columns]
+                writer.write_batch(pa.record_batch(
+                    [pa.array(chunk.ravel(order="F"))], schema=schema
+                ))
+
+
+def load_matrix(file_path):
+    """
+    Load a matrix saved with save_matrix().
+
+    The file is memory-mapped. Without compression and with a single record
+    batch, the values are a read-only view on the file (no copy); otherwise
+    each batch is decompressed into one Fortran-ordered array.
+
+    Parameters
+    ----------
+    file_path : Path
+        File saved with save_matrix().
+
+    Returns
+    -------
+    df : pd.DataFrame()
+        Labelled matrix.
+    """
+    reader = pa.ipc.open_file(pa.memory_map(str(file_path), "r"))
+    metadata = reader.schema.metadata
+    n_rows, n_columns = json.loads(metadata[b"shape"])
+    chunk_columns = int(metadata[b"chunk_columns"])
+
+    if reader.num_record_batches == 1:
+        values = (
+            reader.get_batch(0).column(0)
+            .to_numpy(zero_copy_only=False)
+            .reshape((n_rows, n_columns), order="F")
+        )
+    else:
+        values = np.empty((n_rows, n_columns), order="F")
+        for batch_number in range(reader.num_record_batches):
+            start = batch_number * chunk_columns
+            chunk = reader.get_batch(batch_number).column(0).to_numpy()
+            values[:, start:start + chunk_columns] = chunk.reshape(
+                (n_rows, -1), order="F"
+            )
+
+    return pd.DataFrame(
+        values,
+        index=_labels_from_json(metadata[b"index"].decode()),
+        columns=_labels_from_json(metadata[b"columns"].decode()),
+        copy=False
+    )
+
+
+def save_footprint_long(df, save_path, epsilon=0):
+    """
+    Save a footprint matrix in long (COO) format as Parquet.
+
+    Only entries with an absolute value above epsilon are kept. Each entry
+    is stored with its row and column position and with every label level
+    dictionary-encoded (integer codes), so that read_footprint_long() can
+    filter on labels when reading. Entries are sorted by row, which keeps
+    the Parquet row-group statistics of the output labels selective. The
+    full row and column labels are stored once, in the file metadata.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Footprint with named MultiIndex rows and columns, e.g. with the
+        levels area_output, ... and area_input, ...
+    save_path : Path
+        File to save, e.g. "DNK.parquet".
+    epsilon : FLOAT, optional
+        Entries with an absolute value of at most epsilon are dropped. The
+        default is 0 (only zeros are dropped).
+
+    Returns
+    -------
+    None.
+    """
+    values = df.values
+    rows, columns = np.nonzero(np.abs(values) > epsilon)
+    arrays = {
+        "row": pa.array(rows.astype(np.int32)),
+        "column": pa.array(columns.astype(np.int32)),
+    }
+    for labels, positions in [(df.index, rows), (df.columns, columns)]:
+        labels = labels.to_frame(index=False)
+        for name in labels.columns:
+            codes, uniques = pd.factorize(labels[name])
+            arrays[name] = pa.DictionaryArray.from_arrays(
+                codes[positions].astype(np.int32),
+                # Labels keep their dtype, e.g. integer area codes
+                pa.array(uniques)
+            )
+    arrays["value"] = pa.array(values[rows, columns])
+
+    table = pa.table(arrays).replace_schema_metadata({
+        "shape": json.dumps(list(df.shape)),
+        "index": _labels_to_json(df.index),
+        "columns": _labels_to_json(df.columns),
+    })
+    pq.write_table(table, save_path, compression="zstd")
+
+
+def read_footprint_long(file_path, filters=None, wide=False):
+    """
+    Read a footprint saved with save_footprint_long().
+
+    Parameters
+    ----------
+    file_path : Path
+        File saved with save_footprint_long().
+    filters : list, optional
+        Predicates on the labels, pushed down to the Parquet reader so that
+        row groups without matching entries are skipped, e.g.
+        [("group_output", "==", "Primary crops")].
+    wide : BOOL, optional
+        Return the full labelled matrix instead of the long table. Entries
+        not read (dropped when saving or filtered out) are zero.
+
+    Returns
+    -------
+    df : pd.DataFrame()
+        Long table with one categorical column per label level and the
+        value, or the labelled matrix if wide=True.
+    """
+    table = pq.read_table(file_path, filters=filters)
+    if not wide:
+        df = table.drop(["row", "column"]).to_pandas()
+        # Parquet only reads string labels back as dictionaries
+        return df.astype({
+            name: "category" for name in df.columns if name != "value"
+        })
+
+    metadata = table.schema.metadata
+    values = np.zeros(json.loads(metadata[b"shape"]))
+    values[
+        table.column("row").to_numpy(),
+        table.column("column").to_numpy()
+    ] = table.column("value").to_numpy()
+    return pd.DataFrame(
+        values,
+        index=_labels_from_json(metadata[b"index"].decode()),
+        columns=_labels_from_json(metadata[b"columns"].decode())
+    )
+
+
+def _group_codes(index, by):
+    """Group position of each label of index, and the sorted groups."""
+    by = [by] if isinstance(by, str) else list(by)
+    if len(by) == 1:
+        codes, groups = index.get_level_values(by[0]).factorize(sort=True)
+        return codes, pd.Index(groups, name=by[0])
+    codes, groups = (
+        index
+        .droplevel([name for name in index.names if name not in by])
+        .reorder_levels(by)
+        .factorize(sort=True)
+    )
+    return codes, pd.MultiIndex.from_tuples(groups, names=by)
+
+
+def _L_columns(L, positions):
+    if isinstance(L, ColumnBlocks):
+        return L.values[:, positions]
+    return L.columns(positions)
+
+
+class RegionFootprint():
+    """
+    Footprint L.mul(y, axis=1) of one region, computed on demand.
+
+    No n x n footprint is built. Every query only uses the columns of L
+    with final demand, a block at a time, so memory is proportional to the
+    query result.
+
+    Attributes
+    ----------
+    index: pd.MultiIndex of the products (rows and columns).
+    y: np.ndarray with the final demand of the region.
+
+    Methods
+    -------
+    select(rows, columns): Returns pd.DataFrame with part of the footprint.
+    sum(axis): Returns pd.Series with row or column sums.
+    groupby(by, axis): Returns pd.DataFrame with rows or columns aggregated.
+    domestic_split(area, by, level): Returns pd.DataFrame with domestic and
+        non-domestic production.
+    to_frame(): Returns the full footprint as pd.DataFrame.
+
+    """
+
+    def __init__(self, L, y, index=None, block_size=2048):
+        """
+        Parameters
+        ----------
+        L : ColumnBlocks OR FACTORISED L
+            Stored L (see read.L_blocks()), or any object with a
+            columns(positions) method returning columns of L, e.g. a
+            Leontief solver holding a factorisation of I - A.
+        y : pd.Series OR np.ndarray
+            Final demand of the region, e.g. a column of Y_iso3c.
+        index : pd.MultiIndex, optional
+            Product labels. Taken from L or y when not given.
+        block_size : INT, optional
+            Number of columns of L used at a time.
+
+        Returns
+        -------
+        None.
+        """
+        self.L = L
+        if index is None:
+            if isinstance(L, ColumnBlocks):
+                index = _labels_to_index(L.index)
+            else:
+                index = y.index
+        self.index = index
+        self.y = np.asarray(y, dtype=np.float64)
+        self.block_size = block_size
+        # Columns of L without demand do not contribute to the footprint
+        self._demand = np.flatnonzero(self.y)
+
+    def _blocks(self, positions=None):
+        """Column positions and footprint columns, a block at a time."""
+        if positions is None:
+            positions = self._demand
+        else:
+            positions = np.intersect1d(positions, self._demand)
+        for start in range(0, len(positions), self.block_size):
+            block = positions[start:start + self.block_size]
+            yield block, _L_columns(self.L, block) * self.y[block]
+
+    def _positions(self, selection):
+        """Positions from a boolean mask, positions or None (all)."""
+        if selection is None:
+            return np.arange(len(self.index))
+        selection = np.asarray(selection)
+        if selection.dtype == bool:
+            return np.flatnonzero(selection)
+        return selection
+
+    def select(self, rows=None, columns=None):
+        """
+        Part of the footprint as a labelled pd.DataFrame.
+
+        Parameters
+        ----------
+        rows : ARRAY OF BOOL OR INT, optional
+            Mask or positions of the producing products.
+        columns : ARRAY OF BOOL OR INT, optional
+            Mask or positions of the demanded products.
+
+        Returns
+        -------
+        df : pd.DataFrame()
+        """
+        rows = self._positions(rows)
+        columns = self._positions(columns)
+        values = np.zeros((len(rows), len(columns)))
+        column_order = pd.Series(np.arange(len(columns)), index=columns)
+        for block, footprint in self._blocks(columns):
+            values[:, column_order[block].values] = footprint[rows]
+        return pd.DataFrame(
+            values,
+            index=self.index[rows],
+            columns=self.index[columns]
+        )
+
+    def sum(self, axis=1):
+        """
+        Row sums (axis=1, production for the region's demand) or column sums
+        (axis=0, total production per demanded product).
+
+        Returns
+        -------
+        sums : pd.Series()
+        """
+        sums = np.zeros(len(self.index))
+        for block, footprint in self._blocks():
+            if axis == 1:
+                sums += footprint.sum(axis=1)
+            else:
+                sums[block] = footprint.sum(axis=0)
+        return pd.Series(sums, index=self.index)
+
+    def groupby(self, by, axis=1):
+        """
+        Sum rows (axis=0) or columns (axis=1) with the same labels, like
+        to_frame().groupby(level=by, axis=axis).sum().
+
+        Parameters
+        ----------
+        by : STR, list
+            Index level(s) to group by, e.g. ["item", "comm_group", "group"].
+        axis : INT, optional
+            Axis to aggregate.
+
+        Returns
+        -------
+        df : pd.DataFrame()
+            Aggregated footprint. Groups are sorted.
+        """
+        codes, groups = _group_codes(self.index, by)
+
+        if axis == 1:
+            values = np.zeros((len(self.index), len(groups)))
+            for block, footprint in self._blocks():
+                aggregation = sparse.csc_matrix(
+                    (
+                        np.ones(len(block)),
+                        (np.arange(len(block)), codes[block])
+                    ),
+                    shape=(len(block), len(groups))
+                )
+                values += (aggregation.T @ footprint.T).T
+            return pd.DataFrame(values, index=self.index, columns=groups)
+
+        aggregation = sparse.csc_matrix(
+            (np.ones(len(codes)), (np.arange(len(codes)), codes)),
+            shape=(len(codes), len(groups))
+        )
+        values = np.zeros((len(groups), len(self.index)))
+        for block, footprint in self._blocks():
+            values[:, block] = aggregation.T @ footprint
+        return pd.DataFrame(values, index=groups, columns=self.index)
+
+    def domestic_split(self, area, by=("item", "comm_group", "group"),
+                       level="area"):
+        """
+        Footprint with columns grouped by `by`, split into production in the
+        region itself and production elsewhere, see domestic_split().
+
+        Returns
+        -------
+        df : pd.DataFrame()
+        """
+        return domestic_split(
+            self.groupby(list(by), axis=1), area, by=by, level=level
+        )
+
+    def to_frame(self):
+        """Full footprint as a pd.DataFrame (n x n)."""
+        return self.select()
+
+
+def domestic_split(footprint, area, by=("item", "comm_group", "group"),
+                   level="area"):
+    """
+    Footprint of one region split into production in the region itself and
+    production elsewhere (summed over the producing regions).
+
+    Parameters
+    ----------
+    footprint : pd.DataFrame
+        Footprint of the region with the producing products as rows, e.g.
+        RegionFootprint.groupby(by, axis=1) or a grouped_footprints() value.
+    area : STR
+        The region, as labelled in `level`.
+    by : tuple, optional
+        Row levels that the producing products are grouped by.
+    level : STR, optional
+        Row level with the producing region.
+
+    Returns
+    -------
+    df : pd.DataFrame()
+        Rows labelled "Domestic" and "Non-domestic" in `level`, followed by
+        the `by` levels.
+    """
+    by = list(by)
+    domestic = footprint.index.get_level_values(level) == area
+    return pd.concat(
+        [
+            footprint[domestic].groupby(level=by).sum(),
+            footprint[~domestic].groupby(level=by).sum()
+        ],
+        keys=["Domestic", "Non-domestic"],
+        names=[level]
+    )
+
+
+def grouped_footprints(L, Y, by, index=None, block_size=2048):
+    """
+    Footprints of all regions with the demanded products grouped, like
+    RegionFootprint(L, Y[region]).groupby(by, axis=1) for every region.
+
+    L is read once, a block of columns at a time, and each block is used
+    for all regions. With a stored L, this is one pass over the file
+    instead of one per region.
+
+    Parameters
+    ----------
+    L : ColumnBlocks OR FACTORISED L
+        Stored L (see read.L_blocks()), or any object with a
+        columns(positions) method returning columns of L.
+    Y : pd.DataFrame
+        Final demand with one column per region, e.g. Y_iso3c.
+    by : STR, list
+        Index level(s) to group the demanded products by, e.g.
+        ["item", "comm_group", "group"].
+    index : pd.MultiIndex, optional
+        Product labels. Taken from L or Y when not given.
+    block_size : INT, optional
+        Number of columns of L used at a time.
+
+    Returns
+    -------
+    footprints : dict
+        pd.DataFrame with the footprint of each region (products x groups),
+        by region.
+    """
+    if index is None:
+        if isinstance(L, ColumnBlocks):
+            index = _labels_to_index(L.index)
+        else:
+            index = Y.index
+    codes, groups = _group_codes(index, by)
+    demand = np.asarray(Y, dtype=np.float64)
+    values = np.zeros((demand.shape[1], len(index), len(groups)))
+
+    # Columns of L without demand in any region do not contribute
+    positions = np.flatnonzero(np.any(demand != 0, axis=1))
+    for start in range(0, len(positions), block_size):
+        block = positions[start:start + block_size]
+        L_block = _L_columns(L, block)
+        for region in range(demand.shape[1]):
+            aggregation = sparse.csc_matrix(
+                (demand[block, region], (np.arange(len(block)), codes[block])),
+                shape=(len(block), len(groups))
+            )
+            values[region] += (aggregation.T @ L_block.T).T
+
+    return {
+        region: pd.DataFrame(values[column], index=index, columns=groups)
+        for column, region in enumerate(Y.columns)
+    }
+
+
+def _nbytes(obj):
+    """Approximate memory use of loaded data (arrays, frames and containers).
+    """
+    if isinstance(obj, dict):
+        return sum(_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(value) for value in obj)
+    if isinstance(obj, SparseFrame):
+        return _nbytes(obj.matrix)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(index=False)))
+    if sparse.issparse(obj):
+        return sum(
+            getattr(obj, name).nbytes
+            for name in ["data", "indices", "indptr"]
+            if hasattr(obj, name)
+        )
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    return 0
+
+
+class Prefetcher():
+    """
+    Iterate over years while the next years are loaded in the background.
+
+    `load(year)` runs on a background thread, so reading year t+1 overlaps
+    with the computations on year t. A thread is used, rather than a process,
+    so that the loaded arrays do not have to be copied between processes;
+    decompression, file I/O and most NumPy/SciPy work release the GIL.
+
+    Attributes
+    ----------
+    depth: Maximum number of years loaded ahead of the current year.
+    max_memory: Maximum bytes held by years loaded ahead, or None.
+    load_time: Seconds spent in `load`.
+    wait_time: Seconds the caller waited for a year to be loaded.
+
+    Methods
+    -------
+    report(): Prints and returns the time spent loading and overlapped.
+
+    """
+
+    def __init__(self, load, years, depth=1, max_memory=None):
+        """
+        Parameters
+        ----------
+        load : function
+            Function loading the data of one year, `load(year)`.
+        years : list
+            Years to load, in order.
+        depth : INT, optional
+            Maximum number of years loaded ahead of the current year.
+        max_memory : INT, FLOAT, optional
+            Maximum bytes held by years loaded ahead of the current year.
+            At least one year is always loaded ahead.
+
+        Returns
+        -------
+        None.
+        """
+        self.load = load
+        self.years = list(years)
+        self.depth = max(int(depth), 1)
+        self.max_memory = max_memory
+        self.load_time = 0
+        self.wait_time = 0
+
+        self._loaded = {}
+        self._loaded_bytes = 0
+        self._error = None
+        self._stop = False
+        self._condition = threading.Condition()
+
+    def _has_room(self):
+        if len(self._loaded) >= self.depth:
+            return False
+        if self.max_memory is not None and self._loaded:
+            return self._loaded_bytes < self.max_memory
+        return True
+
+    def _worker(self):
+        for year in self.years:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stop or self._has_room()
+                )
+                if self._stop:
+                    return
+            start = time.perf_counter()
+            try:
+                data = self.load(year)
+            except BaseException as error:
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                return
+            self.load_time += time.perf_counter() - start
+
+            with self._condition:
+                self._loaded[year] = (data, _nbytes(data))
+                self._loaded_bytes += self._loaded[year][1]
+                self._condition.notify_all()
+
+    def __iter__(self):
+        """
+        Yields
+        ------
+        year : INT
+            The current year.
+        data : object
+            Return value of `load(year)`.
+        """
+        thread = threading.Thread(target=self._worker, daemon=True)
+        thread.start()
+        try:
+            for year in self.years:
+                start = time.perf_counter()
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: year in self._loaded or self._error
+                    )
+                    if year not in self._loaded:
+                        raise self._error
+                    data, nbytes = self._loaded.pop(year)
+                    self._loaded_bytes -= nbytes
+                    self._condition.notify_all()
+                self.wait_time += time.perf_counter() - start
+                yield year, data
+                del data
+        finally:
+            with self._condition:
+                self._stop = True
+                self._condition.notify_all()
+            thread.join()
+            self.report()
+
+    def report(self):
+        """
+        Print the time spent loading and how much of it was overlapped with
+        the computations of the caller.
+
+        Returns
+        -------
+        report : dict
+            Load, wait and overlapped time in seconds.
+        """
+        report = {
+            "load": self.load_time,
+            "wait": self.wait_time,
+            "overlapped": max(self.load_time - self.wait_time, 0),
+        }
+        print(
+            f"Prefetcher: loading took {report['load']:.1f} s, of which "
+            f"{report['overlapped']:.1f} s overlapped with computations "
+            f"(waited {report['wait']:.1f} s)"
+        )
+        return report
+
+
+class FabioViews():
+    """
+    All FABIO views of a year that the result stages need, in one pass.
+
+    The biomass Z and Y (by consuming country) are read from the biomass
+    database. The calorie Y is read once per year and split into the
+    consumed, losses and other-losses buckets, by consuming country. The
+    calorie buckets of the last year are kept in memory and all years are
+    saved in the binary cache of the calories database, so no stage reads
+    the calorie Y more than once per year.
+
+    Attributes
+    ----------
+    reader: read() of the biomass database.
+    reader_cal: read() of the calories database.
+    final_demand_categories: Final demand categories of the biomass Y.
+    final_demand_categories_cal: Final demand categories counted as
+                consumed calories.
+
+    Methods
+    -------
+    get(year): Returns dict with the views of a year.
+    calories(year): Returns dict with only the calorie views of a year.
+
+    The calorie views are returned as writable copies of the cached ones.
+
+    """
+
+    def __init__(
+            self,
+            fabio_path,
+            fabio_calories_path,
+            final_demand_categories,
+            final_demand_categories_cal,
+            version=1.2,
+            **kwargs
+            ):
+        """
+        Parameters
+        ----------
+        fabio_path : Path
+            Folder of the biomass (mass) FABIO database.
+        fabio_calories_path : Path
+            Folder of the calories FABIO database.
+        final_demand_categories : list
+            Final demand categories of the biomass Y.
+        final_demand_categories_cal : list
+            Final demand categories counted as consumed calories. All other
+            categories are other losses, of which "losses" is also its own
+            bucket.
+        version : FLOAT, optional
+            FABIO version.
+        **kwargs
+            Passed on to both readers, e.g. cache_path or backend.
+
+        Returns
+        -------
+        None.
+        """
+        self.reader = read(fabio_path, version=version, **kwargs)
+        self.reader_cal = read(fabio_calories_path, version=version, **kwargs)
+        self.final_demand_categories = list(final_demand_categories)
+        self.final_demand_categories_cal = list(final_demand_categories_cal)
+        self._calories = {}
+
+    def calories(self, year):
+        """
+        Load the calorie views of a year.
+
+        The views are writable copies, so callers can change them in place
+        (e.g. set negative values to zero) without changing the cached
+        views, which are memory-mapped read-only from the binary cache.
+
+        Parameters
+        ----------
+        year : INT
+            Year to load.
+
+        Returns
+        -------
+        views : dict
+            "Y_cal", "Y_cal_losses" and "Y_cal_other_losses", as in get().
+        """
+        if year in self._calories:
+            return self._copy_calories(year)
+
+        names = ["Y_cal", "Y_cal_losses", "Y_cal_other_losses"]
+        cache_dir = self.reader_cal._cache_dir("Y.rds")
+        if cache_dir is not None:
+            categories = hashlib.sha256(
+                ";".join(sorted(self.final_demand_categories_cal)).encode()
+            ).hexdigest()[:12]
+            entry_path = cache_dir / f"{year}_views_{categories}"
+            arrays = _cache_load(
+                entry_path, names + [f"{name}_columns" for name in names]
+            )
+            if arrays is not None:
+                self._calories = {year: {
+                    name: pd.DataFrame(
+                        arrays[name],
+                        index=self.reader_cal.io_index,
+                        columns=pd.Index(
+                            arrays[f"{name}_columns"], name="iso3c"
+                        )
+                    )
+                    for name in names
+                }}
+                return self._copy_calories(year)
+
+        self.reader_cal.year = year
+        Y_cal = self.reader_cal.Y(sparse=True)
+        buckets = {
+            "Y_cal": Y_cal.select_labels(
+                "final demand", self.final_demand_categories_cal
+            ),
+            "Y_cal_losses": Y_cal.select_labels("final demand", ["losses"]),
+            "Y_cal_other_losses": Y_cal.select_labels(
+                "final demand",
+                self.final_demand_categories_cal,
+                complement=True
+            ),
+        }
+        buckets = {
+            name: bucket.groupby(["iso3c"], axis=1).to_frame()
+            for name, bucket in buckets.items()
+        }
+
+        if cache_dir is not None:
+            _cache_save(
+                entry_path,
+                {
+                    **{name: df.values for name, df in buckets.items()},
+                    **{
+                        f"{name}_columns": df.columns.values.astype(str)
+                        for name, df in buckets.items()
+                    }
+                }
+            )
+
+        self._calories = {year: buckets}
+        return self._copy_calories(year)
+
+    def _copy_calories(self, year):
+        return {
+            name: df.copy() for name, df in self._calories[year].items()
+        }
+
+    def get(self, year):
+        """
+        Load all views of a year.
+
+        Parameters
+        ----------
+        year : INT
+            Year to load.
+
+        Returns
+        -------
+        views : dict
+            Views of the year, the calorie views as writable copies:
+            "Z": biomass Z as SparseFrame.
+            "Y": biomass Y by consuming country (iso3c).
+            "Y_cal": consumed calories by consuming country.
+            "Y_cal_losses": calorie losses by consuming country.
+            "Y_cal_other_losses": calories not consumed (losses and other)
+                by consuming country.
+        """
+        self.reader.year = year
+        views = {
+            "Z": self.reader.Z(version="mass", sparse=True),
+            "Y": self.reader.Y(
+                final_demand=self.final_demand_categories,
+                aggregate=["iso3c"]
+            ),
+        }
+        views.update(self.calories(year))
+        return views
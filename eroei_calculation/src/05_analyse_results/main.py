@@ -34,7 +34,6 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 # %%
-from rpy2 import robjects
 
 cm = sns.light_palette("green", as_cmap=True)
 cc = coco.CountryConverter(include_obsolete=True)
@@ -668,24 +667,23 @@ Y = reader.Y()
 # %%
 exclude_negatives = True
 
+# %%
+# All FABIO data of a year (biomass Z and Y, calorie Y buckets) in one pass.
+# The calorie buckets are cached, so the calorie Y is read once per year.
+views = fabio_functions.FabioViews(
+    fabio_path,
+    fabio_calories_path,
+    final_demand_categories,
+    final_demand_categories_cal,
+    version=1.2
+)
+
 # %%
 Y_cal_list = []
 for year in tqdm(years):
     # Calorie data
-    reader_cal = fabio_functions.read(
-        fabio_calories_path,
-        year=year,
-        version=1.2
-    )
-
-    Y_cal = reader_cal.Y()
     y_regions_cal = (
-        Y_cal
-        .loc[
-            :,
-            Y_cal.columns.isin(final_demand_categories_cal, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
+        views.calories(year)["Y_cal"]
         .droplevel(["area_code", "item_code", "comm_code"])
     ) * 4.1858e-6  # TJ / Mcal
 
@@ -700,20 +698,8 @@ Y_cal = pd.concat(Y_cal_list, keys=years, names=["year"], axis=0).rename(iso3_ma
 Y_cal_losses_list = []
 for year in tqdm(years):
     # Calorie data
-    reader_cal = fabio_functions.read(
-        fabio_calories_path,
-        year=year,
-        version=1.2
-    )
-
-    Y_cal = reader_cal.Y()
     y_regions_cal = (
-        Y_cal
-        .loc[
-            :,
-            Y_cal.columns.isin(["losses"], level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
+        views.calories(year)["Y_cal_losses"]
         .droplevel(["area_code", "item_code", "comm_code"])
     ) * 4.1858e-6  # TJ / Mcal
     Y_cal_losses_list.append(y_regions_cal)
@@ -767,30 +753,12 @@ product_mapping = (
 
 
 # %%
-readRDS = robjects.r['readRDS']
-# Read RDS file
-rds_file = readRDS(str(fabio_path / "E.rds"))
-
-dfs_landuse = []
-for year in years:
-    # Extract year
-    try:
-        rds_file_year = rds_file[rds_file.names.index(f"{year}")]
-    except ValueError:
-        print("No data for year:", year)
-        continue
-    dfs_tmp = []
-    for key in rds_file_year.names:
-        if key in ["area"]:  # ! Encoding error when reading area
-            continue
-        df_tmp = pd.DataFrame.from_dict(
-            {key: np.asarray(rds_file_year.rx2(key))}
-        )
-        dfs_tmp.append(df_tmp)
-    df_landuse = pd.concat(dfs_tmp, axis=1)
-    dfs_landuse.append(df_landuse)
-
-FABIO_landuse = pd.concat(dfs_landuse, axis=0, keys=years, names=["year"])
+# Satellite accounts of all years in one table (cached after the first run)
+FABIO_landuse = (
+    views.reader.E_all_years()
+    .loc[lambda df: df["year"].isin(years)]
+    .set_index("year")
+)
 
 # %%
 crop_landuse = FABIO_landuse[~(FABIO_landuse["item"] == "Grazing")].groupby(["year"])["landuse"].sum()
@@ -806,24 +774,11 @@ primary_upstream_energy_allocated_list = []
 processed_upstream_energy_allocated_list = []
 exclude_negatives = True
 for year in years:
-    reader = fabio_functions.read(
-        fabio_path,
-        year=year,
-        version=1.2
-    )
-
-    Z = reader.Z(version="mass")
+    year_views = views.get(year)
+    Z = year_views["Z"]
 
     # TODO: read Y from file instead
-    Y = reader.Y()
-    Y = (
-        Y
-        .loc[
-            :,
-            Y.columns.isin(final_demand_categories, level="final demand")
-        ]
-        .groupby(["iso3c"], axis=1).sum()
-    )
+    Y = year_views["Y"]
     if exclude_negatives:
         Y[Y < 0] = 0
 
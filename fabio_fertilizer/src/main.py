@@ -3,10 +3,13 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 from pathlib import Path
 import country_converter as coco
 cc = coco.CountryConverter(include_obsolete=True)
-from rpy2  import robjects
+# The FABIO reader of eroei_calculation, which also reads E.rds on its own
+sys.path.append(str(Path("../../eroei_calculation/src/05_analyse_results")))
+import fabio_functions
 
 # %%
 # Define variables
@@ -55,32 +58,11 @@ Ludemann_df = (
 
 # %%
 # Load landuse data from FABIO
-readRDS = robjects.r['readRDS']
-# Read RDS file
-rds_file = readRDS(str(data_path / "raw" / "FABIO" / "E.rds"))
-
-dfs = []
-for year in years:
-    # Extract year
-    try:
-        rds_file_year = rds_file[rds_file.names.index(f"{year}")]
-    except ValueError:
-        print("No data for year:", year)
-        continue
-    dfs_tmp = []
-    for key in rds_file_year.names:
-        if key in ["area"]:  # ! Encoding error when reading area
-            continue
-        df_tmp = pd.DataFrame.from_dict(
-            {key: np.asarray(rds_file_year.rx2(key))}
-        )
-        dfs_tmp.append(df_tmp)
-    df = pd.concat(dfs_tmp, axis=1)
-    dfs.append(df)
-
+# Satellite accounts of all years in one table (cached after the first run)
 FABIO_landuse = (
-    pd.concat(dfs, axis=0, keys=years, names=["year"])
-    .reset_index()
+    fabio_functions.read_E_all_years(data_path / "raw" / "FABIO")
+    .loc[lambda df: df["year"].isin(years)]
+    .reset_index(drop=True)
     .loc[:, ["year", "area_code", "item", "comm_group", "group", "landuse"]]
 )
 